@@ -0,0 +1,402 @@
+#!/usr/bin/env python
+"""
+Udacity Item Catalog Project
+
+Python Version 3.7.2 used when created
+
+This module is an async (ASGI) entry point for the Flask application in
+application.py, for serving many concurrent API pollers from one process:
+
+    uvicorn asgi:asgi_app --port 8000
+
+The three JSON read endpoints are answered by async handlers. They share
+the catalog cache, category registry and ETags of the Flask application,
+and query SQLite through aiosqlite on a miss, so a poll never ties up a
+thread. Every other route, including pagination, streaming and the login
+flow, is passed to the Flask application unchanged through asgiref, as is
+every request when the database is not SQLite. Passed requests run on a
+pool of ASGI_MAX_THREADS threads, so a login waiting on Google holds up
+neither the async handlers nor other Flask requests.
+
+Requires the aiosqlite and asgiref (>= 3.12, < 4) packages
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import re
+import time
+from urllib.parse import parse_qs
+
+import aiosqlite
+import asgiref
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from werkzeug.http import http_date, is_resource_modified
+
+from application import app, catalogCache, categoryRegistry, replicaEngine
+from application import getEncodedBody, makeJSONEntry, pickEncoding, session
+from application import requestDuration, requestsTotal
+from databaseSetup import getStorageProfile
+
+catalogRoute = re.compile(r"^/catalog\.json$")
+categoryRoute = re.compile(r"^/catalog/([^/]+)\.json$")
+itemRoute = re.compile(r"^/catalog/([^/]+)/([^/]+)\.json$")
+# The Flask rules of the routes above, so both share metric series
+catalogRule = "/catalog.json"
+categoryRule = "/catalog/<string:category_name>.json"
+itemRule = "/catalog/<string:category_name>/<string:item_title>.json"
+
+_MISSING = object()
+
+# The asgiref versions PooledWsgiToAsgiInstance works with, from the first
+# with a duplicate_header_limit up to the next major version
+ASGIREF_VERSIONS = ((3, 12), (4, 0))
+if not (ASGIREF_VERSIONS[0] <=
+        tuple(int(part) for part in asgiref.__version__.split(".")[:2]) <
+        ASGIREF_VERSIONS[1]):
+    raise ImportError(("asgi.py needs asgiref >= 3.12 and < 4, found "
+                       "{}").format(asgiref.__version__))
+
+
+class AsyncConnectionPool:
+    """A fixed size pool of aiosqlite connections, opened on first use
+
+    Attributes:
+        path (str): The SQLite database file
+        size (int): The maximum number of open connections
+        profile (dict): The PRAGMAs set on every new connection
+    """
+
+    def __init__(self, path, size, profile=None):
+        self.path = path
+        self.size = size
+        self.profile = profile or {}
+        self._idle = None
+        self._opened = 0
+
+    async def acquire(self):
+        """Returns an idle connection, opening one if the pool is not full
+        and waiting for one to be released otherwise
+        """
+        if self._idle is None:
+            self._idle = asyncio.LifoQueue()
+        if self._idle.empty() and self._opened < self.size:
+            self._opened += 1
+            connection = await aiosqlite.connect(self.path)
+            for pragma, value in self.profile.items():
+                await connection.execute(
+                    ("PRAGMA {}={}").format(pragma, value))
+            return connection
+        return await self._idle.get()
+
+    def release(self, connection):
+        """Given a connection taken from acquire, makes it available again"""
+        self._idle.put_nowait(connection)
+
+    async def fetchall(self, query, parameters=()):
+        """Given a query and its parameters, runs it on a pooled connection
+
+        Returns:
+                A list of the result rows
+        """
+        connection = await self.acquire()
+        try:
+            async with connection.execute(query, parameters) as cursor:
+                return await cursor.fetchall()
+        finally:
+            self.release(connection)
+
+
+# The async handlers only speak SQLite. For any other database every
+# request goes to the Flask application
+asyncReads = replicaEngine.dialect.name == "sqlite"
+# Reads go to the replica, like the read only Flask views
+pool = AsyncConnectionPool(replicaEngine.url.database,
+                           app.config["DB_POOL_SIZE"],
+                           getStorageProfile(app.config["SQLITE_PROFILE"]))
+
+
+def parseTimestamp(value):
+    """Given a DateTime column value as stored by SQLAlchemy in SQLite,
+    returns it as a datetime. None stays None
+    """
+    if value is None:
+        return None
+    return datetime.fromisoformat(value)
+
+
+def checkCategoryRegistry():
+    """Same as the Flask application's before_request hook. Only touches the
+    database once per CATEGORY_REGISTRY_TTL, and runs in a worker thread
+    """
+    try:
+        categoryRegistry.all()
+    finally:
+        session.remove()
+
+
+async def loadCatalog():
+    """Returns the cache entry for /catalog.json, mirroring catalogJSON"""
+    rows = await pool.fetchall(
+        "SELECT category.id, category.name, item.cat_id, item.description, "
+        "item.id, item.title FROM category "
+        "LEFT OUTER JOIN item ON item.cat_id = category.id "
+        "ORDER BY category.id, item.id")
+    modified = await pool.fetchall("SELECT max(updated_at) FROM category")
+    serializedCategories = []
+    current = None
+    for cat_id, cat_name, item_cat_id, description, item_id, title in rows:
+        if current is None or current["id"] != cat_id:
+            # Mirrors Category.serialize
+            current = {"id": cat_id, "name": cat_name}
+            serializedCategories.append(current)
+        if item_id is not None:
+            # Mirrors Item.serialize
+            current.setdefault("Item", []).append(
+                {"cat_id": item_cat_id, "description": description,
+                 "id": item_id, "title": title})
+    with app.app_context():
+        return makeJSONEntry({"Category": serializedCategories},
+                             parseTimestamp(modified[0][0]))
+
+
+async def loadCategory(category_name):
+    """Returns the cache entry for a category, mirroring categoryJSON"""
+    category = categoryRegistry.byName(category_name)
+    if category is None:
+        return None
+    rows = await pool.fetchall(
+        "SELECT cat_id, description, id, title FROM item "
+        "WHERE cat_id = ? ORDER BY id", (category.id,))
+    catSerialized = category.serialize
+    if len(rows) > 0:
+        catSerialized["Item"] = [
+            {"cat_id": cat_id, "description": description, "id": item_id,
+             "title": title} for cat_id, description, item_id, title in rows]
+    with app.app_context():
+        return makeJSONEntry(catSerialized, category.updated_at)
+
+
+async def loadItem(category_name, item_title):
+    """Returns the cache entry for an item, mirroring itemJson"""
+    category = categoryRegistry.byName(category_name)
+    if category is None:
+        return ("Category {} not found").format(category_name), None
+    rows = await pool.fetchall(
+        "SELECT cat_id, description, id, title, updated_at FROM item "
+        "WHERE cat_id = ? AND title = ?", (category.id, item_title))
+    if len(rows) == 0:
+        return ("Item {} not found").format(item_title), None
+    cat_id, description, item_id, title, updated_at = rows[0]
+    with app.app_context():
+        return None, makeJSONEntry({"cat_id": cat_id,
+                                    "description": description,
+                                    "id": item_id, "title": title},
+                                   parseTimestamp(updated_at))
+
+
+async def cached(key, loader):
+    """Same as catalogCache.getOrLoad, for an async loader"""
+    version = catalogCache.version
+    entry = catalogCache.get((version,) + key, _MISSING)
+    if entry is _MISSING:
+        entry = await loader()
+        catalogCache.set((version,) + key, entry)
+    return entry
+
+
+async def send(sendMessage, status, headers, body=b""):
+    """Sends a complete HTTP response through an ASGI send callable"""
+    await sendMessage({"type": "http.response.start", "status": status,
+                       "headers": [(k.encode("latin-1"), v.encode("latin-1"))
+                                   for k, v in headers]})
+    await sendMessage({"type": "http.response.body", "body": body})
+
+
+async def sendEntry(scope, sendMessage, entry):
+    """Given an entry made by makeJSONEntry, sends it as a JSON response,
+    compressed if the client accepts it, or as 304 Not Modified if the
+    client already has this version
+    """
+    body, etag, lastModified = entry
+    environ = {"REQUEST_METHOD": scope["method"]}
+    for name, value in scope["headers"]:
+        if name in (b"if-none-match", b"if-modified-since",
+                    b"accept-encoding"):
+            key = "HTTP_" + name.decode("latin-1").upper().replace("-", "_")
+            environ[key] = value.decode("latin-1")
+    encoding = pickEncoding(body, environ.get("HTTP_ACCEPT_ENCODING"))
+    if encoding is not None:
+        # Only compresses on the first request for this catalog version
+        body, etag = await asyncio.get_running_loop().run_in_executor(
+            None, getEncodedBody, entry, encoding)
+    headers = [("ETag", '"{}"'.format(etag)), ("Vary", "Accept-Encoding")]
+    if lastModified is not None:
+        headers.append(("Last-Modified", http_date(lastModified)))
+    if not is_resource_modified(environ, etag=etag,
+                                last_modified=lastModified):
+        await send(sendMessage, 304, headers)
+        return
+    headers += [("Content-Type", "application/json"),
+                ("Content-Length", str(len(body)))]
+    if encoding is not None:
+        headers.append(("Content-Encoding", encoding))
+    if scope["method"] == "HEAD":
+        body = b""
+    await send(sendMessage, 200, headers, body)
+
+
+async def sendNotFound(sendMessage, message):
+    """Sends the plain message the Flask views return for missing data"""
+    body = message.encode("utf-8")
+    await send(sendMessage, 200, [("Content-Type", "text/html; charset=utf-8"),
+                                  ("Content-Length", str(len(body)))], body)
+
+
+# The threads the requests passed to the Flask application run on
+passthroughExecutor = ThreadPoolExecutor(app.config["ASGI_MAX_THREADS"],
+                                         thread_name_prefix="flask")
+
+
+class PooledWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """A WsgiToAsgiInstance running the WSGI application on
+    passthroughExecutor. The base class runs it in asgiref's thread
+    sensitive mode, on one thread shared by the whole process, so a single
+    slow request (e.g. a login waiting on Google) would queue all the others
+    """
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self.runWsgiApp, thread_sensitive=False,
+                            executor=passthroughExecutor)(body)
+
+    def runWsgiApp(self, body):
+        """Runs the WSGI application on the request body and sends its
+        response, the way the base class does. Called on a thread of
+        passthroughExecutor, so start_response runs on the thread of the
+        request
+
+        Args:
+                body (file): The request body
+        """
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Too many duplicate headers
+            self.sync_send({"type": "http.response.start", "status": 400,
+                            "headers": [(b"content-type", b"text/plain")]})
+            self.sync_send({"type": "http.response.body",
+                            "body": b"Bad Request"})
+            return
+        sent = 0
+        for output in self.wsgi_application(environ, self.start_response):
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            # Never send more than the Content-Length the application set
+            if self.response_content_length is not None:
+                output = output[:self.response_content_length - sent]
+            self.sync_send({"type": "http.response.body", "body": output,
+                            "more_body": True})
+            sent += len(output)
+            if sent == self.response_content_length:
+                break
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({"type": "http.response.body"})
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    """A WsgiToAsgi adapter running every request on passthroughExecutor"""
+
+    async def __call__(self, scope, receive, send):
+        await PooledWsgiToAsgiInstance(self.wsgi_application,
+                                       self.duplicate_header_limit)(
+            scope, receive, send)
+
+
+wsgiApp = PooledWsgiToAsgi(app)
+
+
+async def lifespan(receive, sendMessage):
+    """Answers the ASGI lifespan protocol. There is nothing to set up, and
+    the pooled connections are left for the process exit to close
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await sendMessage({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await sendMessage({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def asgi_app(scope, receive, sendMessage):
+    """The ASGI application. Answers the unpaginated JSON read endpoints
+    itself and passes everything else to the Flask application
+    """
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, sendMessage)
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if (not asyncReads or scope["type"] != "http" or
+            scope["method"] not in ("GET", "HEAD") or
+            "after" in query or "limit" in query):
+        return await wsgiApp(scope, receive, sendMessage)
+    path = scope["path"]
+    catalogMatch = catalogRoute.match(path)
+    categoryMatch = categoryRoute.match(path)
+    itemMatch = itemRoute.match(path)
+    streaming = app.config["STREAM_CATALOG_JSON"]
+    if not (itemMatch or categoryMatch or (catalogMatch and not streaming)):
+        return await wsgiApp(scope, receive, sendMessage)
+
+    if catalogMatch:
+        rule = catalogRule
+    elif categoryMatch:
+        rule = categoryRule
+    else:
+        rule = itemRule
+    start = time.perf_counter()
+    statuses = []
+
+    async def sendAndRecord(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+        await sendMessage(message)
+    try:
+        await answerJSON(scope, sendAndRecord, catalogMatch, categoryMatch,
+                         itemMatch)
+    finally:
+        # Same metrics as the Flask hooks, less the SQL counts
+        requestsTotal.inc(method=scope["method"], route=rule,
+                          status=statuses[0] if statuses else 500)
+        requestDuration.observe(time.perf_counter() - start,
+                                method=scope["method"], route=rule)
+
+
+async def answerJSON(scope, sendMessage, catalogMatch, categoryMatch,
+                     itemMatch):
+    """Answers a request for one of the JSON read endpoints, given the
+    match of its route
+    """
+    if not categoryRegistry.isFresh():
+        await asyncio.get_running_loop().run_in_executor(
+            None, checkCategoryRegistry)
+    if catalogMatch:
+        entry = await cached(("catalog.json", 0, None), loadCatalog)
+    elif categoryMatch:
+        category_name = categoryMatch.group(1)
+        entry = await cached(("category.json", category_name, 0, None),
+                             lambda: loadCategory(category_name))
+        if entry is None:
+            return await sendNotFound(
+                sendMessage, ("Category {} not found").format(category_name))
+    else:
+        category_name, item_title = itemMatch.groups()
+        notFound, entry = await cached(
+            ("item.json", category_name, item_title),
+            lambda: loadItem(category_name, item_title))
+        if notFound is not None:
+            return await sendNotFound(sendMessage, notFound)
+    await sendEntry(scope, sendMessage, entry)
@@ -0,0 +1,897 @@
+#!/usr/bin/env python
+"""
+Udacity Item Catalog Project
+
+Python Version 3.7.2 used when created
+
+This module is a command line tool to benchmark the Flask application.
+For every catalog size (and with --categories, every number of
+categories to spread it over) it seeds a fresh itemCatalog.db with the bulk
+loader, drives each route through the Flask test client (the add, edit
+and delete flows with a stubbed login session, and the paginated routes
+on their first page and on their last full page), and records the p50 and
+p99 latency and throughput of each route and the peak RSS of the process.
+With --workers it also serves the database with gunicorn at each worker
+count and measures the read routes over HTTP, with --threads it measures
+the read throughput in process at each thread count, and with --profiles it
+measures a mixed read/write workload under each SQLite storage profile.
+With --serving it compares the sync (gunicorn) and async (uvicorn with
+asgi.py) serving modes on API polls made while logins wait on a slow
+stand in for Google
+
+The results can be saved as a baseline, and later runs compared against
+it: any route slower (or any process larger) than the baseline by more
+than the tolerance fails the run
+
+    python benchmark.py --sizes 1000,100000 --save-baseline
+    python benchmark.py --sizes 1000,100000
+    python benchmark.py --sizes 100000 --workers 1,2,4 --concurrency 16
+    python benchmark.py --sizes 100000 --categories 10,1000,10000 --cold
+    python benchmark.py --sizes 100000 --threads 1,2,4,8 --cold
+    python benchmark.py --sizes 100000 --profiles rollback,wal
+    python benchmark.py --sizes 100000 --serving --logins 16
+"""
+
+import argparse
+import json
+import math
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+repoDir = os.path.dirname(os.path.abspath(__file__))
+
+# Routes that only read, and the add/edit/delete flows that need a login
+readRoutes = ["showCatalog", "showCategoryItems", "showItem", "catalogJSON",
+              "categoryJSON", "itemJSON"]
+# The paginated routes, each on its first page and on its last full page
+pagedRoutes = ["showCategoryItems", "categoryJSON", "catalogJSON"]
+readRoutes += [("{}{}Page").format(name, page) for name in pagedRoutes
+               for page in ("First", "Deep")]
+writeRoutes = ["addItem", "editItem", "deleteItem"]
+
+# Result fields where a larger value is a regression, and where a smaller
+# one is
+higherIsWorse = ["p50_ms", "p99_ms", "peak_rss_mb", "errors"]
+lowerIsWorse = ["rps"]
+
+
+def percentile(latencies, p):
+    """Given latencies, returns their p-th percentile (nearest rank)
+
+    Args:
+            latencies (list): The measured latencies, in any order
+            p (float): The percentile, between 0 and 100
+
+    Returns:
+            The latency at that percentile
+    """
+    ordered = sorted(latencies)
+    rank = max(int(math.ceil(p / 100.0 * len(ordered))), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies, elapsed):
+    """Given the latencies of a route and the wall time they took, returns
+    its result fields
+
+    Args:
+            latencies (list): The latency of every request, in seconds
+            elapsed (float): The wall time of all the requests, in seconds
+
+    Returns:
+            A dict of p50_ms, p99_ms, rps and requests
+    """
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "requests": len(latencies),
+        "rps": len(latencies) / max(elapsed, 1e-9)
+    }
+
+
+def peakRSS(who=resource.RUSAGE_SELF):
+    """Returns the peak resident set size of this process, in MB"""
+    maxrss = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == "darwin":
+        return maxrss / (1024.0 * 1024.0)
+    return maxrss / 1024.0
+
+
+def seedDatabase(items, seed, batchSize, categories=None):
+    """Creates itemCatalog.db in the current directory with a synthetic
+    catalog, unless an earlier run already did
+
+    Args:
+            items (int): The number of items to generate
+            seed (int): Seed for the random generator, for repeatable runs
+            batchSize (int): The number of rows per transaction
+            categories (int): The number of categories to spread the items
+                over, one per thousand items (at least 10) by default
+    """
+    if os.path.exists("itemCatalog.db"):
+        return
+    # Importing databaseSetup creates the tables
+    from databaseSetup import engine
+    from bulkLoader import generateCatalog, insertBatches, loadOrder
+    from bulkLoader import loadableRows, resetSequence
+    sources = generateCatalog(engine, users=10,
+                              categories=categories or max(10, items // 1000),
+                              items=items, seed=seed)
+    for name, table in loadOrder:
+        insertBatches(engine, table, loadableRows(table, sources[name]),
+                      batchSize)
+        resetSequence(engine, table)
+
+
+def pickTargets(application, pageSize):
+    """Returns the names of a category and one of its items to request,
+    the id of a user to log in as, a category id to add items to, and the
+    cursors of the last full page of the category and of the catalog
+
+    Args:
+            application (module): The imported application module
+            pageSize (int): The number of rows per page
+
+    Returns:
+            A dict of category_name, item_title, user_id, cat_id,
+            page_size, deep_item_after and deep_category_after
+    """
+    from databaseSetup import Category, Item
+    session = application.session
+    item = session.query(Item).order_by(Item.id).first()
+    category = session.query(Category).filter_by(id=item.cat_id).one()
+    items = session.query(Item.id).filter_by(cat_id=category.id).order_by(
+        Item.id)
+    categories = session.query(Category.id).order_by(Category.id)
+    targets = {"category_name": category.name, "item_title": item.title,
+               "user_id": item.user_id, "cat_id": category.id,
+               "page_size": pageSize,
+               "deep_item_after": deepCursor(items, pageSize),
+               "deep_category_after": deepCursor(categories, pageSize)}
+    session.remove()
+    return targets
+
+
+def deepCursor(ids, pageSize):
+    """Given a query of ids in order, returns the ?after= cursor of the
+    last full page of them, or 0 when they fit on the first page
+    """
+    offset = ids.count() - pageSize - 1
+    if offset < 0:
+        return 0
+    return ids.offset(offset).limit(1).scalar()
+
+
+def readURLs(targets):
+    """Returns the URL of every read route for the given targets"""
+    category = targets["category_name"]
+    item = targets["item_title"]
+    urls = {
+        "showCatalog": "/catalog",
+        "showCategoryItems": ("/catalog/{}/items").format(category),
+        "showItem": ("/catalog/{}/{}").format(category, item),
+        "catalogJSON": "/catalog.json",
+        "categoryJSON": ("/catalog/{}.json").format(category),
+        "itemJSON": ("/catalog/{}/{}.json").format(category, item)
+    }
+    cursors = {"showCategoryItems": targets["deep_item_after"],
+               "categoryJSON": targets["deep_item_after"],
+               "catalogJSON": targets["deep_category_after"]}
+    for name in pagedRoutes:
+        for page, after in (("First", 0), ("Deep", cursors[name])):
+            urls[("{}{}Page").format(name, page)] = (
+                "{}?after={}&limit={}").format(urls[name], after,
+                                               targets["page_size"])
+    return urls
+
+
+def timeRequests(calls):
+    """Given callables that each make one request, calls them in order
+
+    Args:
+            calls (iterable): Callables returning a test client response
+
+    Returns:
+            The result fields of summarize for the requests
+    """
+    latencies = []
+    start = time.perf_counter()
+    for call in calls:
+        before = time.perf_counter()
+        response = call()
+        latencies.append(time.perf_counter() - before)
+        if response.status_code >= 400:
+            raise SystemExit(("{} answered {}").format(
+                response.request.path, response.status_code))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def benchmarkInProcess(args):
+    """Measures every selected route on the database in the current
+    directory through the Flask test client
+
+    Args:
+            args (Namespace): The parsed command line arguments
+
+    Returns:
+            A dict of route name to its result fields
+    """
+    import application
+    application.app.secret_key = "benchmark"
+    targets = pickTargets(application, args.page_size)
+    client = application.app.test_client()
+    with client.session_transaction() as stubSession:
+        # What gconnect stores after a successful Google login
+        stubSession["username"] = "Benchmark User"
+        stubSession["email"] = "benchmark@example.com"
+        stubSession["user_id"] = targets["user_id"]
+
+    def coldOrWarm(url):
+        if args.cold:
+            application.catalogCache.bump()
+        return client.get(url)
+
+    results = {}
+    urls = readURLs(targets)
+    for name in readRoutes:
+        if name not in args.routes:
+            continue
+        url = urls[name]
+        for i in range(args.warmup):
+            coldOrWarm(url)
+        results[name] = timeRequests(
+            (lambda: coldOrWarm(url)) for i in range(args.requests))
+
+    # Each flow works on the items made by the one before, so that the
+    # database is left as it was seeded
+    category = targets["category_name"]
+    titles = [("Benchmark Item {}").format(i) for i in range(args.requests)]
+    if "addItem" in args.routes:
+        results["addItem"] = timeRequests(
+            (lambda title=title: client.post("/catalog/add", data={
+                "title": title, "description": "Added by the benchmark",
+                "cat_id": targets["cat_id"]})) for title in titles)
+    if "addItem" in args.routes and "editItem" in args.routes:
+        results["editItem"] = timeRequests(
+            (lambda title=title: client.post(
+                ("/catalog/{}/{}/edit").format(category, title),
+                data={"title": "", "description": "Edited by the benchmark",
+                      "cat_id": targets["cat_id"]})) for title in titles)
+    if "addItem" in args.routes and "deleteItem" in args.routes:
+        results["deleteItem"] = timeRequests(
+            (lambda title=title: client.post(
+                ("/catalog/{}/{}/delete").format(category, title)))
+            for title in titles)
+    return results
+
+
+def freePort():
+    """Returns a TCP port nothing is listening on"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def waitForServer(port, process, timeout=60):
+    """Waits until a server accepts connections on port
+
+    Raises:
+            SystemExit: If the server exits or is not up within timeout
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("The server exited while starting")
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("The server did not start")
+
+
+def serverCommand(mode, port):
+    """Returns the command serving the database in the current directory
+    on port, in the sync (gunicorn) or async (uvicorn) serving mode
+    """
+    if mode == "async":
+        return [sys.executable, "-m", "uvicorn", "asgi:asgi_app",
+                "--app-dir", repoDir, "--host", "127.0.0.1",
+                "--port", str(port), "--log-level", "warning"]
+    return [sys.executable, "-m", "gunicorn",
+            "-c", os.path.join(repoDir, "gunicorn.conf.py"),
+            "--pythonpath", repoDir]
+
+
+def benchmarkWorkers(args, workers):
+    """Serves the database in the current directory with gunicorn and
+    measures the selected read routes over HTTP, with args.concurrency
+    clients each making keep-alive requests
+
+    Args:
+            args (Namespace): The parsed command line arguments
+            workers (int): The number of gunicorn worker processes
+
+    Returns:
+            A dict of route name to its result fields
+    """
+    import requests
+    import application
+    targets = pickTargets(application, args.page_size)
+    port = freePort()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers),
+               CATALOG_BIND=("127.0.0.1:{}").format(port),
+               CATALOG_SECRET_KEY="benchmark")
+    server = subprocess.Popen(serverCommand("sync", port), env=env)
+    local = threading.local()
+
+    def get(url):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        before = time.perf_counter()
+        response = local.session.get(url)
+        response.raise_for_status()
+        return time.perf_counter() - before
+
+    results = {}
+    try:
+        waitForServer(port, server)
+        urls = readURLs(targets)
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            for name in readRoutes:
+                if name not in args.routes:
+                    continue
+                url = ("http://127.0.0.1:{}{}").format(port, urls[name])
+                list(pool.map(get, [url] * args.warmup))
+                start = time.perf_counter()
+                latencies = list(pool.map(get, [url] * args.requests))
+                results[name] = summarize(latencies,
+                                          time.perf_counter() - start)
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def benchmarkThreads(args, threads):
+    """Measures the selected read routes on the database in the current
+    directory from threads, each with a Flask test client of its own and
+    so a database session of its own, for args.duration seconds
+
+    Args:
+            args (Namespace): The parsed command line arguments
+            threads (int): The number of threads making requests
+
+    Returns:
+            A dict of "reads" to its result fields, with the number of
+            failed requests under "errors"
+    """
+    import application
+    targets = pickTargets(application, args.page_size)
+    urls = [url for name, url in readURLs(targets).items()
+            if name in args.routes] or ["/catalog.json"]
+    stop = threading.Event()
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def reader(number):
+        client = application.app.test_client()
+        mine = []
+        failed = 0
+        count = number
+        while not stop.is_set():
+            url = urls[count % len(urls)]
+            if args.cold:
+                application.catalogCache.bump()
+            before = time.perf_counter()
+            try:
+                failed += int(client.get(url).status_code >= 400)
+            except Exception:
+                failed += 1
+            mine.append(time.perf_counter() - before)
+            count += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    workers = [threading.Thread(target=reader, args=(number,))
+               for number in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(args.duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    results = {}
+    if latencies:
+        results["reads"] = summarize(latencies, elapsed)
+        results["reads"]["errors"] = errors[0]
+    return results
+
+
+def benchmarkMixed(args):
+    """Measures reads and writes running at the same time on the database
+    in the current directory: args.readers threads request the selected
+    read routes while args.writers threads add and delete items, for
+    args.duration seconds. Only meaningful in a process of its own, as the
+    storage profile is picked when the application is imported
+
+    Args:
+            args (Namespace): The parsed command line arguments
+
+    Returns:
+            A dict of "reads" and "writes" to their result fields, each
+            with the number of failed requests under "errors"
+    """
+    import application
+    application.app.secret_key = "benchmark"
+    targets = pickTargets(application, args.page_size)
+    urls = [url for name, url in readURLs(targets).items()
+            if name in args.routes] or ["/catalog.json"]
+    category = targets["category_name"]
+    stop = threading.Event()
+    latencies = {"reads": [], "writes": []}
+    errors = {"reads": 0, "writes": 0}
+    lock = threading.Lock()
+
+    def timed(kind, call):
+        before = time.perf_counter()
+        try:
+            failed = call().status_code >= 400
+        except Exception:
+            failed = True
+        elapsed = time.perf_counter() - before
+        with lock:
+            latencies[kind].append(elapsed)
+            errors[kind] += int(failed)
+
+    def reader():
+        client = application.app.test_client()
+        count = 0
+        while not stop.is_set():
+            url = urls[count % len(urls)]
+            if args.cold:
+                application.catalogCache.bump()
+            timed("reads", lambda: client.get(url))
+            count += 1
+
+    def writer(number):
+        client = application.app.test_client()
+        with client.session_transaction() as stubSession:
+            stubSession["username"] = "Benchmark User"
+            stubSession["email"] = "benchmark@example.com"
+            stubSession["user_id"] = targets["user_id"]
+        count = 0
+        while not stop.is_set():
+            title = ("Mixed Item {} {}").format(number, count)
+            timed("writes", lambda: client.post("/catalog/add", data={
+                "title": title, "description": "Added by the benchmark",
+                "cat_id": targets["cat_id"]}))
+            timed("writes", lambda: client.post(
+                ("/catalog/{}/{}/delete").format(category, title)))
+            count += 1
+
+    threads = ([threading.Thread(target=reader)
+                for i in range(args.readers)] +
+               [threading.Thread(target=writer, args=(i,))
+                for i in range(args.writers)])
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    results = {}
+    for kind in ("reads", "writes"):
+        if latencies[kind]:
+            results[kind] = summarize(latencies[kind], elapsed)
+            results[kind]["errors"] = errors[kind]
+    return results
+
+
+def startSlowGoogle(delay):
+    """Starts a local stand in for Google that answers every call after
+    delay seconds, as a slow provider would
+
+    Returns:
+            The running ThreadingHTTPServer
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def loginCookie(application, user_id):
+    """Returns the Cookie header of a session holding what gconnect stores
+    after a successful Google login, signed with the benchmark's secret key
+    """
+    app = application.app
+    app.secret_key = "benchmark"
+    value = app.session_interface.get_signing_serializer(app).dumps({
+        "access_token": "benchmark", "gplus_id": "benchmark",
+        "username": "Benchmark User", "email": "benchmark@example.com",
+        "picture": "", "user_id": user_id})
+    return ("{}={}").format(app.config["SESSION_COOKIE_NAME"], value)
+
+
+def benchmarkServing(args, mode):
+    """Serves the database in the current directory in one process of the
+    given serving mode. For args.duration seconds, args.logins clients log
+    out over and over, each logout waiting args.login_delay seconds on
+    Google, while args.concurrency clients poll /catalog.json
+
+    Args:
+            args (Namespace): The parsed command line arguments
+            mode (str): "sync" (gunicorn) or "async" (uvicorn and asgi.py)
+
+    Returns:
+            A dict of "logins" and "polls" to their result fields, each
+            with the number of failed requests under "errors"
+    """
+    import requests
+    import application
+    targets = pickTargets(application, args.page_size)
+    # Sent as a header, so that the cookie each logout sets is ignored
+    headers = {"Cookie": loginCookie(application, targets["user_id"])}
+    google = startSlowGoogle(args.login_delay)
+    port = freePort()
+    env = dict(os.environ, WEB_CONCURRENCY="1",
+               CATALOG_BIND=("127.0.0.1:{}").format(port),
+               CATALOG_SECRET_KEY="benchmark",
+               CATALOG_OAUTH_REVOKE_URL=("http://127.0.0.1:{}/revoke").format(
+                   google.server_address[1]))
+    server = subprocess.Popen(serverCommand(mode, port), env=env)
+    base = ("http://127.0.0.1:{}").format(port)
+    stop = threading.Event()
+    latencies = {"logins": [], "polls": []}
+    errors = {"logins": 0, "polls": 0}
+    lock = threading.Lock()
+
+    def client(kind, url, expected):
+        http = requests.Session()
+        while not stop.is_set():
+            before = time.perf_counter()
+            try:
+                response = http.get(url, headers=headers,
+                                    allow_redirects=False)
+                failed = response.status_code != expected
+            except requests.RequestException:
+                failed = True
+            elapsed = time.perf_counter() - before
+            with lock:
+                latencies[kind].append(elapsed)
+                errors[kind] += int(failed)
+
+    try:
+        waitForServer(port, server)
+        requests.get(base + "/catalog.json").raise_for_status()
+        threads = ([threading.Thread(target=client, args=(
+            "logins", base + "/gdisconnect", 302))
+            for i in range(args.logins)] +
+            [threading.Thread(target=client, args=(
+                "polls", base + "/catalog.json", 200))
+             for i in range(args.concurrency)])
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+        google.shutdown()
+    results = {}
+    for kind in ("logins", "polls"):
+        if latencies[kind]:
+            results[kind] = summarize(latencies[kind], elapsed)
+            results[kind]["errors"] = errors[kind]
+    return results
+
+
+def runSize(args):
+    """Benchmarks one catalog size in this process, which was started in
+    the directory of its database, and prints the results as JSON
+    """
+    seedDatabase(args.run_size, args.seed, args.batch_size,
+                 args.run_categories)
+    if args.run_mixed:
+        print(json.dumps(benchmarkMixed(args)))
+        return
+    results = {"routes": benchmarkInProcess(args), "peak_rss_mb": peakRSS()}
+    if args.workers:
+        results["workers"] = {str(workers): benchmarkWorkers(args, workers)
+                              for workers in args.workers}
+    if args.threads:
+        results["threads"] = {str(threads): benchmarkThreads(args, threads)
+                              for threads in args.threads}
+    if args.serving:
+        results["serving"] = {mode: benchmarkServing(args, mode)
+                              for mode in ("sync", "async")}
+    print(json.dumps(results))
+
+
+def catalogShapes(args):
+    """Yields (key, items, categories) for every catalog to benchmark: one
+    per size, or with --categories one per size and number of categories,
+    keyed e.g. 100000x1000. A categories of None is the seeding default
+    """
+    for size in args.sizes:
+        if not args.categories:
+            yield str(size), size, None
+        for categories in args.categories:
+            yield ("{}x{}").format(size, categories), size, categories
+
+
+def shapeTitle(key):
+    """Given a key made by catalogShapes, returns it in words"""
+    items, _, categories = key.partition("x")
+    if categories:
+        return ("{} items in {} categories").format(items, categories)
+    return ("{} items").format(items)
+
+
+def runAll(args, argv):
+    """Benchmarks every catalog in a fresh process and database of its own
+
+    Args:
+            args (Namespace): The parsed command line arguments
+            argv (list): The command line arguments, passed on to each run
+
+    Returns:
+            A dict of catalog key (see catalogShapes) to the results
+            printed by runSize
+    """
+    workdir = args.workdir or tempfile.mkdtemp(prefix="catalogBenchmark")
+    results = {}
+    for key, size, categories in catalogShapes(args):
+        sizeDir = os.path.join(workdir, key)
+        os.makedirs(sizeDir, exist_ok=True)
+        # The application reads its OAuth client from the working directory
+        shutil.copy(os.path.join(repoDir, "client_secrets.json"), sizeDir)
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            [repoDir] + os.environ.get("PYTHONPATH", "").split(os.pathsep)))
+        print(("Benchmarking {} in {}").format(shapeTitle(key), sizeDir),
+              file=sys.stderr)
+        runArgs = ["--run-size", str(size)]
+        if categories is not None:
+            runArgs += ["--run-categories", str(categories)]
+
+        def run(*extra, **extraEnv):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__)] + argv +
+                runArgs + list(extra), cwd=sizeDir,
+                env=dict(env, **extraEnv), check=True,
+                stdout=subprocess.PIPE, universal_newlines=True).stdout
+            return json.loads(output.strip().splitlines()[-1])
+        results[key] = run()
+        if args.profiles:
+            # A process per profile, as it is applied to every connection
+            results[key]["mixed"] = {
+                profile: run("--run-mixed", profile,
+                             CATALOG_SQLITE_PROFILE=profile)
+                for profile in args.profiles}
+    if args.workdir is None:
+        shutil.rmtree(workdir)
+    return results
+
+
+def resultGroups(size, sizeResults):
+    """Given the results of one size, yields (name, title, routes) for each
+    group of routes measured: in process, under gunicorn for each number
+    of workers, from each number of threads, and mixed reads and writes
+    for each storage profile
+    """
+    yield (size, shapeTitle(size), sizeResults.get("routes", {}))
+    for workers, routes in sorted(sizeResults.get("workers", {}).items()):
+        yield (("{}/{} workers").format(size, workers),
+               ("{}, {} workers").format(shapeTitle(size), workers), routes)
+    for threads, routes in sorted(sizeResults.get("threads", {}).items(),
+                                  key=lambda t: int(t[0])):
+        yield (("{}/{} threads").format(size, threads),
+               ("{}, reads from {} threads").format(shapeTitle(size),
+                                                    threads), routes)
+    for profile, routes in sorted(sizeResults.get("mixed", {}).items()):
+        yield (("{}/mixed {}").format(size, profile),
+               ("{}, mixed reads and writes, {} profile").format(
+                   shapeTitle(size), profile), routes)
+    for mode, routes in sorted(sizeResults.get("serving", {}).items()):
+        yield (("{}/serving {}").format(size, mode),
+               ("{}, {} serving, with slow logins").format(
+                   shapeTitle(size), mode), routes)
+
+
+def flatten(results):
+    """Given results by size, yields (name, field, value) for every result
+    field, the name being e.g. size/route or size/workers/route
+    """
+    for size, sizeResults in sorted(results.items()):
+        if "peak_rss_mb" in sizeResults:
+            yield size, "peak_rss_mb", sizeResults["peak_rss_mb"]
+        for name, title, routes in resultGroups(size, sizeResults):
+            for route, fields in sorted(routes.items()):
+                for field in higherIsWorse + lowerIsWorse:
+                    if field in fields:
+                        yield (("{}/{}").format(name, route), field,
+                               fields[field])
+
+
+def printResults(results):
+    """Prints results by size as a table"""
+    print(("{:<40} {:>10} {:>10} {:>10}").format("", "p50 ms", "p99 ms",
+                                                 "req/s"))
+    for size, sizeResults in sorted(
+            results.items(),
+            key=lambda r: [int(n) for n in r[0].split("x")]):
+        for name, title, routes in resultGroups(size, sizeResults):
+            if name == size and "peak_rss_mb" in sizeResults:
+                title += (" (peak RSS {:.1f} MB)").format(
+                    sizeResults["peak_rss_mb"])
+            if len(routes) == 0:
+                continue
+            print(title)
+            for route, fields in routes.items():
+                line = ("  {:<38} {:>10.2f} {:>10.2f} {:>10.1f}").format(
+                    route, fields["p50_ms"], fields["p99_ms"], fields["rps"])
+                if fields.get("errors"):
+                    line += ("  ({} failed)").format(fields["errors"])
+                print(line)
+
+
+def findRegressions(results, baseline, tolerance):
+    """Given results and a baseline, finds every result field worse than
+    its baseline value by more than the tolerance. Fields missing from
+    either side are not compared
+
+    Args:
+            results (dict): The results of this run, by size
+            baseline (dict): The saved results of an earlier run, by size
+            tolerance (float): The allowed relative change, e.g. 0.2
+
+    Returns:
+            A list of messages, one per regression
+    """
+    saved = {(name, field): value
+             for name, field, value in flatten(baseline)}
+    regressions = []
+    for name, field, value in flatten(results):
+        before = saved.get((name, field))
+        if before is None:
+            continue
+        if field in higherIsWorse:
+            worse = value > before * (1 + tolerance)
+        else:
+            worse = value < before * (1 - tolerance)
+        if worse:
+            regressions.append(("{} {}: {:.2f} (baseline {:.2f})").format(
+                name, field, value, before))
+    return regressions
+
+
+def commaSeparatedInts(value):
+    """Parses an argument such as 1000,100000 into a list of ints"""
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the item catalog routes")
+    parser.add_argument("--sizes", type=commaSeparatedInts,
+                        default=[1000, 100000, 1000000],
+                        help="comma separated numbers of items to seed")
+    parser.add_argument("--categories", type=commaSeparatedInts, default=[],
+                        help="comma separated numbers of categories to "
+                        "spread the items of each size over")
+    parser.add_argument("--routes", type=lambda v: v.split(","),
+                        default=readRoutes + writeRoutes,
+                        help="comma separated route names to measure")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=10,
+                        help="unmeasured requests per route first")
+    parser.add_argument("--page-size", type=int, default=50,
+                        help="?limit= of the paginated routes")
+    parser.add_argument("--cold", action="store_true",
+                        help="empty the catalog cache before each read")
+    parser.add_argument("--workers", type=commaSeparatedInts, default=[],
+                        help="comma separated gunicorn worker counts to "
+                        "measure the read routes at over HTTP")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="concurrent HTTP clients with --workers, and "
+                        "pollers with --serving")
+    parser.add_argument("--threads", type=commaSeparatedInts, default=[],
+                        help="comma separated thread counts to measure the "
+                        "read routes at in process, for --duration seconds")
+    parser.add_argument("--profiles", type=lambda v: v.split(","),
+                        default=[],
+                        help="comma separated SQLite storage profiles to "
+                        "measure a mixed read/write workload under")
+    parser.add_argument("--readers", type=int, default=4,
+                        help="reading threads with --profiles")
+    parser.add_argument("--writers", type=int, default=2,
+                        help="writing threads with --profiles")
+    parser.add_argument("--duration", type=float, default=5,
+                        help="seconds to run each mixed or threaded "
+                        "workload for")
+    parser.add_argument("--serving", action="store_true",
+                        help="compare the sync and async serving modes on "
+                        "polls made during slow logins")
+    parser.add_argument("--logins", type=int, default=16,
+                        help="clients logging in and out with --serving")
+    parser.add_argument("--login-delay", type=float, default=1.0,
+                        help="seconds Google takes to answer with --serving")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=10000,
+                        help="rows per transaction while seeding")
+    parser.add_argument("--workdir",
+                        help="directory for the seeded databases, kept and "
+                        "reused across runs (a temporary one by default)")
+    parser.add_argument("--baseline", default="benchmarkBaseline.json",
+                        help="baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="save the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative regression from the baseline")
+    parser.add_argument("--output", help="also write the results here")
+    parser.add_argument("--run-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--run-categories", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--run-mixed", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size is not None:
+        runSize(args)
+        return
+
+    results = runAll(args, sys.argv[1:])
+    printResults(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(("Saved the baseline to {}").format(args.baseline))
+        return
+    if not os.path.exists(args.baseline):
+        print(("No baseline at {}, run with --save-baseline to create "
+               "one").format(args.baseline))
+        return
+    with open(args.baseline) as f:
+        regressions = findRegressions(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(("REGRESSION {}").format(regression))
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
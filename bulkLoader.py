@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""
+Udacity Item Catalog Project
+
+Python Version 3.7.2 used when created
+
+This module is a command line tool to fill the database for this project
+in bulk, either from JSONL/CSV files or with a synthetic catalog of any
+size for load testing. Rows are written with batched executemany inserts,
+one transaction per batch
+
+    python bulkLoader.py load --users users.jsonl --categories cats.csv \\
+        --items items.jsonl
+    python bulkLoader.py generate --users 100 --categories 1000 \\
+        --items 1000000
+"""
+
+import argparse
+import csv
+import json
+import random
+import time
+from itertools import islice
+
+from sqlalchemy import DateTime, create_engine, func, select, text
+
+from databaseSetup import Category, Item, User, applyStorageProfile
+from databaseSetup import getDatabaseURL, setupDatabase
+
+# Tables in the order they have to be loaded to satisfy the foreign keys
+loadOrder = [("users", User.__table__),
+             ("categories", Category.__table__),
+             ("items", Item.__table__)]
+
+words = ("ball bat board boots cap cleats gloves goggles helmet jersey "
+         "net pads puck racket rope shoes shorts skates socks stick "
+         "wax wheels").split()
+
+
+def readRows(path):
+    """Given the path of a JSONL or CSV file, yields its rows as dicts.
+    CSV files need a header row naming the columns
+
+    Args:
+            path (str): The file to read, .csv for CSV and JSONL otherwise
+
+    Yields:
+            One dict per row of the file
+    """
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield {k: (v if v != "" else None) for k, v in row.items()}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def loadableRows(table, rows):
+    """Given a table and rows, keeps only the columns of that table, so
+    every row of an executemany has the same keys. Timestamps are left out
+    so that they get their default (the time of the load)
+
+    Args:
+            table (Table): The table the rows are for
+            rows (iterable): The rows to load, as dicts
+
+    Yields:
+            The rows, restricted to the loadable columns of the table
+    """
+    columns = [c.name for c in table.columns
+               if not isinstance(c.type, DateTime)]
+    for row in rows:
+        yield {c: row.get(c) for c in columns}
+
+
+def insertBatches(engine, table, rows, batchSize):
+    """Given a table and rows, inserts the rows with executemany, committing
+    once per batch, and reports the throughput
+
+    Args:
+            engine (Engine): The engine of the database to load into
+            table (Table): The table to insert into
+            rows (iterable): The rows to insert, as dicts
+            batchSize (int): The number of rows per transaction
+
+    Returns:
+            The number of rows inserted
+    """
+    rows = iter(rows)
+    count = 0
+    start = time.time()
+    while True:
+        batch = list(islice(rows, batchSize))
+        if len(batch) == 0:
+            break
+        with engine.begin() as connection:
+            connection.execute(table.insert(), batch)
+        count += len(batch)
+    elapsed = max(time.time() - start, 1e-9)
+    print(("{}: {} rows in {:.2f}s ({:.0f} rows/sec)").format(
+        table.name, count, elapsed, count / elapsed))
+    return count
+
+
+def nextId(engine, table):
+    """Given a table, returns the first id not used by any of its rows
+
+    Args:
+            engine (Engine): The engine of the database
+            table (Table): The table to check
+
+    Returns:
+            One more than the largest id in the table
+    """
+    with engine.connect() as connection:
+        maxId = connection.execute(select([func.max(table.c.id)])).scalar()
+    return (maxId or 0) + 1
+
+
+def resetSequence(engine, table):
+    """Given a table just loaded with explicit ids, moves its id sequence
+    past them. Only PostgreSQL needs this: its serial ids do not advance
+    when rows are inserted with an id, and SQLite picks max(id) + 1 anyway
+
+    Args:
+            engine (Engine): The engine of the database that was loaded
+            table (Table): The table that was loaded
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    name = engine.dialect.identifier_preparer.quote(table.name)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "SELECT setval(pg_get_serial_sequence(:name, 'id'), max(id)) "
+            "FROM {}".format(name)), name=name)
+
+
+def generateCatalog(engine, users, categories, items, seed):
+    """Generates rows for a synthetic catalog, appended after whatever is
+    already in the database. Items are spread randomly over the new
+    categories and users (or the existing ones if none are generated)
+
+    Args:
+            engine (Engine): The engine of the database being filled
+            users (int): The number of users to generate
+            categories (int): The number of categories to generate
+            items (int): The number of items to generate
+            seed (int): Seed for the random generator, for repeatable runs
+
+    Returns:
+            A dict of table name to an iterable of rows for that table
+    """
+    rng = random.Random(seed)
+    firstUser = nextId(engine, User.__table__)
+    firstCategory = nextId(engine, Category.__table__)
+    firstItem = nextId(engine, Item.__table__)
+    userIds = (firstUser, firstUser + users) if users else (1, firstUser)
+    catIds = ((firstCategory, firstCategory + categories) if categories
+              else (1, firstCategory))
+    if items and (userIds[0] >= userIds[1] or catIds[0] >= catIds[1]):
+        raise SystemExit("Items need at least one user and one category")
+
+    def userRows():
+        for i in range(firstUser, firstUser + users):
+            yield {"id": i, "name": ("User {}").format(i),
+                   "email": ("user{}@example.com").format(i),
+                   "picture": None}
+
+    def categoryRows():
+        for i in range(firstCategory, firstCategory + categories):
+            yield {"id": i, "name": ("Category {}").format(i)}
+
+    def itemRows():
+        for i in range(firstItem, firstItem + items):
+            description = " ".join(rng.choice(words) for w in range(8))
+            yield {"id": i, "title": ("Item {}").format(i),
+                   "description": description,
+                   "cat_id": rng.randrange(*catIds),
+                   "user_id": rng.randrange(*userIds)}
+
+    return {"users": userRows(), "categories": categoryRows(),
+            "items": itemRows()}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fill the item catalog database in bulk")
+    parser.add_argument("--db", default=getDatabaseURL(),
+                        help="database URL to load into (default "
+                        "CATALOG_DATABASE_URL, or itemCatalog.db)")
+    parser.add_argument("--batch-size", type=int, default=10000,
+                        help="rows per transaction")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    load = commands.add_parser("load", help="load rows from files")
+    for name, table in loadOrder:
+        load.add_argument("--" + name, metavar="FILE",
+                          help=("JSONL or CSV file of {}").format(name))
+
+    generate = commands.add_parser("generate",
+                                   help="generate a synthetic catalog")
+    generate.add_argument("--users", type=int, default=10)
+    generate.add_argument("--categories", type=int, default=100)
+    generate.add_argument("--items", type=int, default=10000)
+    generate.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    engine = create_engine(args.db)
+    applyStorageProfile(engine)
+    # Importing databaseSetup only set up the default database
+    setupDatabase(engine)
+
+    if args.command == "load":
+        sources = {name: readRows(getattr(args, name))
+                   for name, table in loadOrder if getattr(args, name)}
+    else:
+        sources = generateCatalog(engine, args.users, args.categories,
+                                  args.items, args.seed)
+
+    total = 0
+    start = time.time()
+    for name, table in loadOrder:
+        if name in sources:
+            rows = loadableRows(table, sources[name])
+            total += insertBatches(engine, table, rows, args.batch_size)
+            resetSequence(engine, table)
+    elapsed = max(time.time() - start, 1e-9)
+    print(("total: {} rows in {:.2f}s ({:.0f} rows/sec)").format(
+        total, elapsed, total / elapsed))
+
+
+if __name__ == "__main__":
+    main()
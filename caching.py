@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+"""
+Udacity Item Catalog Project
+
+Python Version 3.7.2 used when created
+
+This module holds the in-process caches used by the Flask application
+to avoid hitting the database for data that has not changed
+"""
+
+from collections import OrderedDict
+import sys
+import threading
+import time
+
+_MISSING = object()
+# Containers longer than this have their size extrapolated from a sample
+_SIZE_SAMPLE = 64
+
+
+def estimateSize(value):
+    """Given a cached value, estimates the bytes of memory it holds,
+    following lists, tuples and dicts. Dict keys are left out, as the
+    serialized rows all share the same few. Long containers are measured on
+    a sample of their elements, so that a large export costs little to size
+
+    Args:
+            value: The value to measure
+
+    Returns:
+            The estimated size, in bytes
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        elements = list(value.values())
+    elif isinstance(value, (list, tuple)):
+        elements = value
+    else:
+        return size
+    if len(elements) <= _SIZE_SAMPLE:
+        return size + sum(estimateSize(e) for e in elements)
+    step = len(elements) // _SIZE_SAMPLE
+    sample = [estimateSize(elements[i * step]) for i in range(_SIZE_SAMPLE)]
+    return size + sum(sample) * len(elements) // _SIZE_SAMPLE
+
+
+class LRUCache:
+    """A thread safe, size capped cache that evicts the least recently used
+    entry once it is full, keeping hit and miss counters for monitoring
+
+    Attributes:
+        maxsize (int): The maximum number of entries held
+        maxbytes (int): The maximum estimated bytes held (see
+            estimateSize), None for no limit
+        bytes (int): The estimated bytes held by the entries
+        hits (int): The number of lookups that found an entry
+        misses (int): The number of lookups that did not find an entry
+        evictions (int): The number of entries dropped to respect maxsize
+            and maxbytes
+    """
+
+    def __init__(self, maxsize, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Given a key, returns the cached value and marks it as recently used
+
+        Args:
+                key: The key to look up
+                default: The value to return if the key is not cached
+
+        Returns:
+                The cached value, or default if none found
+        """
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Given a key and value, caches the value, evicting the least
+        recently used entries if the cache is over its size caps. A value
+        larger than maxbytes on its own is not cached
+
+        Args:
+                key: The key to cache the value under
+                value: The value to cache
+        """
+        size = 0
+        if self.maxbytes is not None:
+            size = estimateSize(value)
+            if size > self.maxbytes:
+                self.pop(key)
+                return
+        with self._lock:
+            if not self._accepts(key):
+                return
+            self._remove(key)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self.bytes += size
+            while (len(self._entries) > self.maxsize or
+                   (self.maxbytes is not None and
+                    self.bytes > self.maxbytes)):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _accepts(self, key):
+        """Returns True if a value may be stored under key. The lock must be
+        held
+        """
+        return True
+
+    def _remove(self, key):
+        """Given a key, removes its entry if there is one. The lock must be
+        held
+        """
+        if self._entries.pop(key, _MISSING) is not _MISSING:
+            self.bytes -= self._sizes.pop(key)
+
+    def pop(self, key):
+        """Given a key, removes its entry from the cache if there is one
+
+        Args:
+                key: The key to evict
+        """
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """Removes every entry from the cache"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.bytes = 0
+
+    def getOrLoad(self, key, loader):
+        """Given a key and a loader, returns the cached value for the key,
+        calling the loader and caching its result on a miss. None is a
+        valid value to cache
+
+        Args:
+                key: The key to look up
+                loader (callable): Called with no arguments to build the value
+
+        Returns:
+                The cached or freshly loaded value
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        """dict: Returns the cache counters in easily serializable format"""
+        return {
+            "bytes": self.bytes,
+            "evictions": self.evictions,
+            "hits": self.hits,
+            "maxbytes": self.maxbytes,
+            "maxsize": self.maxsize,
+            "misses": self.misses,
+            "size": len(self._entries)
+        }
+
+
+class VersionedCache(LRUCache):
+    """An LRUCache whose keys are scoped to a version counter. Bumping the
+    version drops every entry, and entries loaded for an older version are
+    never stored, so memory only ever holds the current version
+
+    Attributes:
+        version (int): The current version, bumped on every write
+    """
+
+    def __init__(self, maxsize, maxbytes=None):
+        super().__init__(maxsize, maxbytes)
+        self.version = 0
+
+    def bump(self):
+        """Moves the cache to a new version, dropping every entry
+
+        Returns:
+                The new version
+        """
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._sizes.clear()
+            self.bytes = 0
+            return self.version
+
+    def _accepts(self, key):
+        """Only stores values loaded for the current version. A value
+        loaded before the latest bump may already be out of date
+        """
+        return key[0] == self.version
+
+    def getOrLoad(self, key, loader):
+        """Same as LRUCache.getOrLoad, with the key scoped to the current
+        version
+
+        Args:
+                key (tuple): The key to look up
+                loader (callable): Called with no arguments to build the value
+
+        Returns:
+                The cached or freshly loaded value
+        """
+        return super().getOrLoad((self.version,) + key, loader)
+
+    def stats(self):
+        """dict: Returns the cache counters in easily serializable format"""
+        stats = super().stats()
+        stats["version"] = self.version
+        return stats
+
+
+class TTLCache(LRUCache):
+    """An LRUCache whose entries also expire ttl seconds after being set
+
+    Attributes:
+        ttl (float): Seconds an entry stays valid
+        expirations (int): The number of lookups that found an expired entry
+    """
+
+    def __init__(self, maxsize, ttl):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Same as LRUCache.get, treating expired entries as missing"""
+        entry = super().get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires, value = entry
+        if time.monotonic() >= expires:
+            with self._lock:
+                self.hits -= 1
+                self.misses += 1
+                self.expirations += 1
+            self.pop(key)
+            return default
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Same as LRUCache.set, with an optional ttl for this entry only"""
+        if ttl is None:
+            ttl = self.ttl
+        super().set(key, (time.monotonic() + ttl, value))
+
+    def stats(self):
+        """dict: Returns the cache counters in easily serializable format"""
+        stats = super().stats()
+        stats["expirations"] = self.expirations
+        stats["ttl"] = self.ttl
+        return stats
+
+
+class CategoryRegistry:
+    """A thread safe, in-memory copy of every Category, so categories can be
+    listed and resolved by name or id without a database query
+
+    Other processes can change the categories too, so at most every ttl
+    seconds the registry asks for a cheap version of the category table
+    and reloads itself if that version changed
+
+    Attributes:
+        ttl (float): Seconds a loaded copy is trusted without a version check
+        reloads (int): The number of times the categories have been loaded
+    """
+
+    def __init__(self, loadCategories, loadVersion, ttl, onChange=None):
+        """
+        Args:
+                loadCategories (callable): Returns every category record
+                loadVersion (callable): Returns a value that changes whenever
+                    any category changes
+                ttl (float): Seconds between version checks
+                onChange (callable): Called with no arguments whenever a
+                    version check finds the categories changed
+        """
+        self.ttl = ttl
+        self.reloads = 0
+        self._loadCategories = loadCategories
+        self._loadVersion = loadVersion
+        self._onChange = onChange
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._checkedAt = None
+
+    def _current(self):
+        """Returns the current (categories, byName, byId) snapshot, checking
+        the version and reloading first if the ttl has run out
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and self.isFresh():
+            return snapshot
+        with self._lock:
+            if self._snapshot is not None and self.isFresh():
+                return self._snapshot
+            version = self._loadVersion()
+            if self._snapshot is None or version != self._version:
+                categories = list(self._loadCategories())
+                self._snapshot = (categories,
+                                  {c.name: c for c in categories},
+                                  {c.id: c for c in categories})
+                if self._version is not None and self._onChange is not None:
+                    self._onChange()
+                self._version = version
+                self.reloads += 1
+            self._checkedAt = time.monotonic()
+            return self._snapshot
+
+    def isFresh(self):
+        """Returns True if the categories were checked less than ttl seconds
+        ago, meaning a lookup will not touch the database
+        """
+        checkedAt = self._checkedAt
+        return (checkedAt is not None and
+                time.monotonic() - checkedAt < self.ttl)
+
+    def all(self):
+        """Returns a list of every category record"""
+        return self._current()[0]
+
+    def byName(self, name):
+        """Given a category name, returns its record. None if none found"""
+        return self._current()[1].get(name)
+
+    def byId(self, cat_id):
+        """Given a category id, returns its record. None if none found"""
+        return self._current()[2].get(cat_id)
+
+    def invalidate(self):
+        """Forces a version check on the next lookup. Called after this
+        process changes the catalog
+        """
+        with self._lock:
+            self._checkedAt = None
@@ -13,9 +13,11 @@ project with a small set of example data
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from databaseSetup import Category, Item, Base, User
+from databaseSetup import Category, Item, Base, User, applyStorageProfile
+from databaseSetup import getDatabaseURL
 
-engine = create_engine('sqlite:///itemCatalog.db')
+engine = create_engine(getDatabaseURL())
+applyStorageProfile(engine)
 
 # Bind the engine to the metadata of the Base class so that the
 # declaratives can be accessed through a DBSession instance
@@ -104,8 +106,9 @@ dataToCommit = [User1, User2, soccer, soccerItem1, soccerItem2,
                 snowboardingItem2, rockClimbing, foosball,
                 skating, hockey, hockeyItem1]
 
-for data in dataToCommit:
-    session.add(data)
-    session.commit()
+# One transaction for everything, rather than one commit per object.
+# Use bulkLoader.py for anything bigger than this example data
+session.add_all(dataToCommit)
+session.commit()
 
 print("Database populated!")
@@ -11,18 +11,38 @@ as declare the implementations of the tables of said database using the
 sqlalchemy object relational mapper
 """
 
+import os
 import sys
 
-from sqlalchemy import Column, ForeignKey, Integer, String, UniqueConstraint
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy import event, func, inspect, select, text
+
+from sqlalchemy.exc import OperationalError
 
 from sqlalchemy.ext.declarative import declarative_base
 
 from sqlalchemy.orm import relationship
 
+from sqlalchemy.schema import CreateTable
+
 from sqlalchemy import create_engine
 
 Base = declarative_base()
 
+DEFAULT_DATABASE_URL = "sqlite:///itemCatalog.db"
+
+
+def getDatabaseURL():
+    """Returns the URL of the database, e.g. postgresql://user@host/catalog
+
+    Returns:
+            The CATALOG_DATABASE_URL environment variable, or the SQLite
+            file itemCatalog.db if it is not set
+    """
+    return os.environ.get("CATALOG_DATABASE_URL", DEFAULT_DATABASE_URL)
+
 
 class User(Base):
     """The User class used to create the user table in the database
@@ -38,9 +58,19 @@ class User(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String(250), nullable=False)
-    email = Column(String(250), nullable=False)
+    email = Column(String(250), nullable=False, index=True)
     picture = Column(String(250))
 
+    @property
+    def serialize(self):
+        """dict: Returns object data in easily serializable format"""
+        return{
+            "email": self.email,
+            "id": self.id,
+            "name": self.name,
+            "picture": self.picture
+        }
+
 
 class Category(Base):
     """The Category class used to create the category table in the database
@@ -49,6 +79,8 @@ class Category(Base):
         __tablename__ (str): The name of the table made (category)
         id (Column): An integer column, used as the primary key
         name (Column): A String(80) column, contains name of the Category
+        updated_at (Column): A DateTime column, last time the Category or any
+            of its Items changed
     """
 
     __tablename__ = "category"  #: The name of the table
@@ -57,6 +89,9 @@ class Category(Base):
 
     name = Column(String(80), nullable=False, unique=True)
 
+    updated_at = Column(DateTime, default=datetime.utcnow,
+                        onupdate=datetime.utcnow)
+
     @property
     def serialize(self):
         """dict: Returns object data in easily serializable format"""
@@ -75,11 +110,12 @@ class Item(Base):
         description (Column): A String(250) column, contains Item description
         id (Column): An integer column, used as the primary key
         title (Column): A String(80) column, contains title/name of the Item
+        updated_at (Column): A DateTime column, last time the Item changed
         user_id (Column): An integer column, a foreign key to the user table
     """
     __tablename__ = "item"
 
-    cat_id = Column(Integer, ForeignKey("category.id"))
+    cat_id = Column(Integer, ForeignKey("category.id"), index=True)
 
     description = Column(String(250))
 
@@ -89,11 +125,21 @@ class Item(Base):
 
     category = relationship(Category)
 
+    updated_at = Column(DateTime, default=datetime.utcnow,
+                        onupdate=datetime.utcnow)
+
     user_id = Column(Integer, ForeignKey("user.id"))
 
     user = relationship(User)
 
-    UniqueConstraint('cat_id', 'title')
+    # A unique index is how SQLite implements a UNIQUE constraint, and unlike
+    # a table constraint it can be added to an existing database. Without
+    # AUTOINCREMENT SQLite hands the id of the last Item deleted to the next
+    # one made, and the change log would mix up the two
+    __table_args__ = (
+        Index("ix_item_cat_id_title", "cat_id", "title", unique=True),
+        {"sqlite_autoincrement": True}
+    )
 
     @property
     def serialize(self):
@@ -105,6 +151,305 @@ class Item(Base):
             "title": self.title
         }
 
-engine = create_engine("sqlite:///itemCatalog.db")
 
-Base.metadata.create_all(engine)
+class ItemChange(Base):
+    """The ItemChange class used to create the item_change table, a log of
+    every write to the item table that clients can sync from
+
+    Attributes:
+        __tablename__ (str): The name of the table made (item_change)
+        seq (Column): An integer column, the primary key. It only ever
+            increases, so a client can ask for the changes after the last
+            one it saw
+        item_id (Column): An integer column, the id of the changed Item
+        cat_id (Column): An integer column, the category of the Item after
+            the change
+        action (Column): A String(10) column, "create", "update" or
+            "delete". A delete is a tombstone: the Item no longer exists
+        changed_at (Column): A DateTime column, when the change was made
+    """
+    __tablename__ = "item_change"
+
+    seq = Column(Integer, primary_key=True)
+
+    item_id = Column(Integer, nullable=False)
+
+    cat_id = Column(Integer)
+
+    action = Column(String(10), nullable=False)
+
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+    # Without AUTOINCREMENT SQLite may hand out a seq again once the rows
+    # holding the highest ones are deleted
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+def upgradeDatabase(engine):
+    """Given an engine, brings a database created by an older version of
+    this module up to date by adding any missing columns and indexes, and
+    rebuilding tables that lack AUTOINCREMENT. New columns are filled in
+    with their default value
+
+    Args:
+            engine (Engine): The engine of the database to upgrade
+    """
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = [c["name"] for c in inspector.get_columns(table.name)]
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                # "user" is a reserved word in PostgreSQL
+                addColumn = "ALTER TABLE {} ADD COLUMN {} {}".format(
+                    quote(table.name), quote(column.name),
+                    column.type.compile(engine.dialect))
+                connection.execute(text(addColumn))
+                if column.default is not None:
+                    value = column.default.arg
+                    if column.default.is_callable:
+                        value = value(None)
+                    connection.execute(
+                        table.update().values({column.name: value}))
+            indexes = [i["name"] for i in inspector.get_indexes(table.name)]
+            for index in table.indexes:
+                if index.name not in indexes:
+                    if index.unique:
+                        checkUnique(connection, table, index)
+                    index.create(connection)
+            if needsAutoincrement(connection, table):
+                rebuildWithAutoincrement(connection, table)
+
+
+def needsAutoincrement(connection, table):
+    """Given a table, checks whether it is declared with AUTOINCREMENT but
+    was created in this SQLite database without it
+
+    Args:
+            connection (Connection): The connection upgrading the database
+            table (Table): The table to check
+
+    Returns:
+            True if the table has to be rebuilt, False otherwise
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+    if not table.dialect_options["sqlite"]["autoincrement"]:
+        return False
+    sql = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND "
+        "name = :name"), name=table.name).scalar()
+    return sql is not None and "AUTOINCREMENT" not in sql.upper()
+
+
+def rebuildWithAutoincrement(connection, table):
+    """Given a SQLite table created without AUTOINCREMENT, copies its rows
+    into a new table that has it, as SQLite cannot alter a primary key.
+    The new sequence starts after every id in use and, for the item table,
+    every id in the change log, so that no id deleted before the upgrade is
+    handed out again
+
+    The rebuild drops the triggers on the table, so the search index is
+    dropped with it, for createSearchIndex to make it again
+
+    Args:
+            connection (Connection): The connection upgrading the database
+            table (Table): The table to rebuild
+    """
+    quote = connection.dialect.identifier_preparer.quote
+    newName = table.name + "_upgrade"
+    columns = ", ".join(quote(column.name) for column in table.columns)
+    createTable = str(CreateTable(table).compile(dialect=connection.dialect))
+    connection.execute(text(createTable.replace(
+        "CREATE TABLE " + quote(table.name), "CREATE TABLE " + quote(newName),
+        1)))
+    connection.execute(text("INSERT INTO {} ({}) SELECT {} FROM {}".format(
+        quote(newName), columns, columns, quote(table.name))))
+    if table.name == "item":
+        connection.execute(text("DROP TABLE IF EXISTS item_search"))
+    connection.execute(text("DROP TABLE {}".format(quote(table.name))))
+    connection.execute(text("ALTER TABLE {} RENAME TO {}".format(
+        quote(newName), quote(table.name))))
+    for index in table.indexes:
+        index.create(connection)
+    lastIds = [connection.execute(select([func.max(table.c.id)])).scalar()]
+    if table.name == "item":
+        lastIds.append(connection.execute(
+            select([func.max(ItemChange.item_id)])).scalar())
+    connection.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"),
+                       name=table.name)
+    connection.execute(text(
+        "INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+        name=table.name, seq=max([0] + [i for i in lastIds if i is not None]))
+
+
+def checkUnique(connection, table, index):
+    """Given a unique index about to be added to an existing table, checks
+    that no rows already share its columns, as creating it would fail
+
+    Args:
+            connection (Connection): The connection upgrading the database
+            table (Table): The table of the index
+            index (Index): The unique index
+
+    Raises:
+            RuntimeError: If rows share the columns of the index, listing
+                up to 10 of the shared values
+    """
+    columns = list(index.columns)
+    duplicates = connection.execute(
+        select(columns + [func.count()]).group_by(*columns).having(
+            func.count() > 1).limit(10)).fetchall()
+    if len(duplicates) == 0:
+        return
+    raise RuntimeError((
+        "Cannot add the unique index {} to {}, as rows share the same ({}). "
+        "Rename or delete all but one of each and run databaseSetup.py "
+        "again. Shared values and row counts: {}").format(
+        index.name, table.name, ", ".join(c.name for c in columns),
+        "; ".join(("{} x{}").format(tuple(row[:-1]), row[-1])
+                  for row in duplicates)))
+
+
+# Full text index over Item titles and descriptions. It is an external
+# content FTS5 table (it stores no copy of the text) kept in sync with the
+# item table by triggers, so every way of writing Items keeps it current
+searchIndexDDL = [
+    """CREATE VIRTUAL TABLE item_search USING fts5(
+        title, description, content='item', content_rowid='id',
+        tokenize='porter unicode61')""",
+    """CREATE TRIGGER item_search_insert AFTER INSERT ON item BEGIN
+        INSERT INTO item_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER item_search_delete AFTER DELETE ON item BEGIN
+        INSERT INTO item_search(item_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER item_search_update
+    AFTER UPDATE OF title, description ON item BEGIN
+        INSERT INTO item_search(item_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO item_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    "INSERT INTO item_search(item_search) VALUES ('rebuild')"
+]
+
+
+def hasSearchIndex(engine):
+    """Given an engine, checks whether its database has the item_search
+    full text index
+
+    Args:
+            engine (Engine): The engine of the database to check
+
+    Returns:
+            True if the index exists, False otherwise
+    """
+    return "item_search" in inspect(engine).get_table_names()
+
+
+def createSearchIndex(engine):
+    """Given an engine, creates the item_search full text index and its
+    triggers and fills it with the existing Items. Does nothing if the index
+    already exists, or if the database is not SQLite with FTS5 support
+
+    Args:
+            engine (Engine): The engine of the database to index
+
+    Returns:
+            True if the index exists afterwards, False otherwise
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    if hasSearchIndex(engine):
+        return True
+    try:
+        with engine.begin() as connection:
+            for statement in searchIndexDDL:
+                connection.execute(text(statement))
+    except OperationalError:
+        # This SQLite build was compiled without FTS5
+        return False
+    return True
+
+
+# Named sets of PRAGMAs applied to every SQLite connection. "wal" lets
+# readers carry on while a write commits, and only syncs to disk at WAL
+# checkpoints (a crash can lose the last commits, never corrupt the file).
+# "rollback" is SQLite's own default behaviour, for comparison
+storageProfiles = {
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        # Negative sizes are in KiB, so this is 64 MiB of page cache
+        "cache_size": -64 * 1024,
+        "busy_timeout": 5000
+    },
+    "rollback": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000
+    }
+}
+
+
+def getStorageProfile(name=None):
+    """Given the name of a storage profile, returns its PRAGMAs
+
+    Args:
+            name (str): A key of storageProfiles. None for the one named by
+                the CATALOG_SQLITE_PROFILE environment variable, "wal" if
+                it is not set
+
+    Returns:
+            A dict of PRAGMA name to value
+    """
+    if name is None:
+        name = os.environ.get("CATALOG_SQLITE_PROFILE", "wal")
+    try:
+        return storageProfiles[name]
+    except KeyError:
+        raise ValueError(("Unknown SQLite storage profile {}").format(name))
+
+
+def applyStorageProfile(engine, name=None):
+    """Given an engine, sets the PRAGMAs of a storage profile on every
+    connection it opens from now on. Does nothing if the database is not
+    SQLite
+
+    Args:
+            engine (Engine): The engine to configure
+            name (str): The storage profile, see getStorageProfile
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    profile = getStorageProfile(name)
+
+    @event.listens_for(engine, "connect")
+    def setPragmas(dbapiConnection, connectionRecord):
+        cursor = dbapiConnection.cursor()
+        for pragma, value in profile.items():
+            cursor.execute(("PRAGMA {}={}").format(pragma, value))
+        cursor.close()
+
+
+def setupDatabase(engine):
+    """Given an engine, creates any missing table of this module, upgrades
+    the tables made by older versions and creates the search index
+
+    Args:
+            engine (Engine): The engine of the database to set up
+    """
+    Base.metadata.create_all(engine)
+    upgradeDatabase(engine)
+    createSearchIndex(engine)
+
+
+engine = create_engine(getDatabaseURL())
+applyStorageProfile(engine)
+setupDatabase(engine)
@@ -0,0 +1,37 @@
+"""
+Udacity Item Catalog Project
+
+Python Version 3.7.2 used when created
+
+Gunicorn settings for serving the Flask application in production. The
+application is imported once in the master process and forked into
+workers, each of which serves requests on a pool of threads
+
+Environment variables:
+    CATALOG_BIND: Address to listen on (default 0.0.0.0:8000)
+    WEB_CONCURRENCY: Worker processes (default 2 per CPU core, plus one)
+    CATALOG_THREADS: Threads per worker (default 4)
+    CATALOG_TIMEOUT: Seconds before a silent worker is restarted (default 30)
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = "wsgi:app"
+bind = os.environ.get("CATALOG_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY",
+                             multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("CATALOG_THREADS", 4))
+worker_class = "gthread"
+timeout = int(os.environ.get("CATALOG_TIMEOUT", 30))
+keepalive = 5
+
+# Import the application (templates, caches, client secrets) once in the
+# master, so workers start fast and share its memory pages
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Gives every worker its own database connections"""
+    from application import afterFork
+    afterFork()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Udacity Item Catalog Project
+
+Python Version 3.7.2 used when created
+
+This module holds the encoders the Flask application uses to turn JSON
+payloads into response bodies: a fast JSON serializer, and the gzip and
+brotli compression offered to clients through Accept-Encoding
+
+The orjson and brotli packages are optional. Without orjson payloads are
+dumped by the standard json module, and without brotli only gzip is
+offered
+"""
+
+import gzip
+import json
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def hasFastJSON():
+    """Returns True if the fast (orjson) serializer is installed"""
+    return orjson is not None
+
+
+def dumpJSON(obj, fast=True):
+    """Given a serializable object, dumps it byte for byte the way jsonify
+    does when it is not pretty printing (sorted keys, no extra whitespace,
+    non-ASCII characters escaped, trailing newline)
+
+    orjson cannot escape non-ASCII characters, so a document holding any
+    is dumped again by the standard json module
+
+    Args:
+            obj: The object to dump
+            fast (bool): Use orjson when it is installed
+
+    Returns:
+            The JSON document as ASCII bytes
+    """
+    if fast and orjson is not None:
+        body = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS |
+                            orjson.OPT_APPEND_NEWLINE)
+        if body.isascii():
+            return body
+    return (json.dumps(obj, sort_keys=True, separators=(",", ":")) +
+            "\n").encode("utf-8")
+
+
+def availableEncodings():
+    """Returns the content codings that can be produced, best first"""
+    if brotli is not None:
+        return ["br", "gzip"]
+    return ["gzip"]
+
+
+def negotiateEncoding(acceptEncoding):
+    """Given the Accept-Encoding header of a request, picks the content
+    coding to answer with. Ties go to the smaller brotli output
+
+    Args:
+            acceptEncoding (str): The header value, None if it was not sent
+
+    Returns:
+            "br" or "gzip", or None to send the body uncompressed
+    """
+    if not acceptEncoding:
+        return None
+    accepted = parse_accept_header(acceptEncoding)
+    return accepted.best_match(availableEncodings())
+
+
+def compressBody(body, encoding, level=6):
+    """Given a response body, compresses it with a content coding
+
+    Args:
+            body (bytes): The body to compress
+            encoding (str): "br" or "gzip", as picked by negotiateEncoding
+            level (int): The compression level, 1 (fastest) to 9 (smallest).
+                Used as the brotli quality too
+
+    Returns:
+            The compressed body
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    # A fixed mtime makes the output, and so its ETag, repeatable
+    return gzip.compress(body, compresslevel=level, mtime=0)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+"""
+Udacity Item Catalog Project
+
+Python Version 3.7.2 used when created
+
+This module holds the counters and histograms the Flask application
+records request latencies and SQL queries in, and renders them in the
+Prometheus text exposition format. Every process keeps its own metrics,
+so with several workers each one is scraped (or summed) separately
+"""
+
+import threading
+
+# Request and query latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+# Buckets for the number of SQL statements run by one request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+def formatLabels(labelNames, labelValues, extra=()):
+    """Given label names and values, returns them formatted as the
+    {name="value",...} suffix of a sample, escaped as Prometheus expects
+
+    Args:
+            labelNames (tuple): The names of the labels
+            labelValues (tuple): The values, in the same order
+            extra (tuple): More (name, value) pairs to append, e.g. le
+
+    Returns:
+            The label suffix, or an empty string if there are no labels
+    """
+    pairs = list(zip(labelNames, labelValues)) + list(extra)
+    if len(pairs) == 0:
+        return ""
+    return "{" + ",".join(
+        ('{}="{}"').format(name, str(value).replace("\\", "\\\\")
+                           .replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs) + "}"
+
+
+def formatNumber(value):
+    """Given a number, returns it as Prometheus writes sample values"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A thread safe counter, kept separately for every combination of
+    label values
+
+    Attributes:
+        name (str): The metric name, ending in _total
+        help (str): The description shown by Prometheus
+        labelNames (tuple): The names of the labels
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelNames=()):
+        self.name = name
+        self.help = help
+        self.labelNames = tuple(labelNames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Given label values, adds amount to their counter
+
+        Args:
+                amount (float): How much to add
+                **labels: A value for every label name
+        """
+        key = tuple(labels[name] for name in self.labelNames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        """Yields the exposition lines of every counter"""
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield ("{}{} {}").format(
+                self.name, formatLabels(self.labelNames, key),
+                formatNumber(value))
+
+
+class Histogram:
+    """A thread safe histogram with cumulative buckets, kept separately for
+    every combination of label values
+
+    Attributes:
+        name (str): The metric name
+        help (str): The description shown by Prometheus
+        labelNames (tuple): The names of the labels
+        buckets (tuple): The upper bounds of the buckets, in increasing order
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelNames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelNames = tuple(labelNames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Given a value and label values, counts the value in the first
+        bucket it fits in
+
+        Args:
+                value (float): The observed value, e.g. a latency in seconds
+                **labels: A value for every label name
+        """
+        key = tuple(labels[name] for name in self.labelNames)
+        with self._lock:
+            counts, total = self._values.get(key, (None, 0))
+            if counts is None:
+                counts = [0] * len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        """Yields the exposition lines of every histogram"""
+        with self._lock:
+            values = sorted((key, (list(counts), total))
+                            for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield ("{}_bucket{} {}").format(
+                    self.name, formatLabels(self.labelNames, key,
+                                            [("le", formatNumber(bound))]),
+                    cumulative)
+            labels = formatLabels(self.labelNames, key)
+            yield ("{}_sum{} {}").format(self.name, labels,
+                                         formatNumber(total))
+            yield ("{}_count{} {}").format(self.name, labels, cumulative)
+
+
+class MetricsRegistry:
+    """The metrics of one process, in the order they were created"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help, labelNames=()):
+        """Creates and registers a Counter. See Counter for the arguments"""
+        metric = Counter(name, help, labelNames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelNames=(), buckets=LATENCY_BUCKETS):
+        """Creates and registers a Histogram. See Histogram for the
+        arguments
+        """
+        metric = Histogram(name, help, labelNames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(("# HELP {} {}").format(metric.name, metric.help))
+            lines.append(("# TYPE {} {}").format(metric.name, metric.kind))
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
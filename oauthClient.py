@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+"""
+Udacity Item Catalog Project
+
+Python Version 3.7.2 used when created
+
+This module holds the client the Flask application uses to talk to
+Google's OAuth endpoints during login and logout. All calls share one
+keep-alive connection pool, are bounded by connect and read timeouts,
+are retried with backoff on connection errors and 5xx responses, and
+have their latency recorded. It also holds the parsed OAuth client
+configuration, so logins never read client_secrets.json
+"""
+
+from collections import namedtuple
+import json
+import os
+import signal
+import threading
+import time
+
+from oauth2client.client import OAuth2WebServerFlow
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+TOKENINFO_URL = "https://www.googleapis.com/oauth2/v1/tokeninfo"
+USERINFO_URL = "https://www.googleapis.com/oauth2/v1/userinfo"
+REVOKE_URL = "https://accounts.google.com/o/oauth2/revoke"
+
+
+class CallStats:
+    """Thread safe latency counters for the calls made to one endpoint
+
+    Attributes:
+        calls (int): The number of calls made
+        errors (int): The number of calls that raised instead of returning
+        totalSeconds (float): The summed latency of every call
+        maxSeconds (float): The slowest call seen
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.totalSeconds = 0.0
+        self.maxSeconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, failed):
+        """Given the latency of a call and whether it failed, counts it
+
+        Args:
+                seconds (float): How long the call took, retries included
+                failed (bool): True if the call raised
+        """
+        with self._lock:
+            self.calls += 1
+            self.errors += int(failed)
+            self.totalSeconds += seconds
+            self.maxSeconds = max(self.maxSeconds, seconds)
+
+    @property
+    def serialize(self):
+        """dict: Returns object data in easily serializable format"""
+        mean = self.totalSeconds / self.calls if self.calls else 0.0
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "max_seconds": self.maxSeconds,
+            "mean_seconds": mean,
+            "total_seconds": self.totalSeconds
+        }
+
+
+class GoogleAPIClient:
+    """A pooled, timeout bounded client for the Google OAuth endpoints
+
+    Attributes:
+        timeout (tuple): The (connect, read) timeouts in seconds
+        stats (dict): CallStats by endpoint name
+    """
+
+    def __init__(self, connectTimeout=3.05, readTimeout=10, retries=2,
+                 backoff=0.3, poolSize=10, tokeninfoURL=TOKENINFO_URL,
+                 userinfoURL=USERINFO_URL, revokeURL=REVOKE_URL):
+        """
+        Args:
+                connectTimeout (float): Seconds to wait for a connection
+                readTimeout (float): Seconds to wait between bytes received
+                retries (int): Retries after a connection error or 5xx
+                backoff (float): Backoff factor between retries, in seconds
+                poolSize (int): Keep-alive connections kept per host
+                tokeninfoURL (str): The token introspection endpoint
+                userinfoURL (str): The user info endpoint
+                revokeURL (str): The token revocation endpoint
+        """
+        self.timeout = (connectTimeout, readTimeout)
+        self.urls = {"tokeninfo": tokeninfoURL, "userinfo": userinfoURL,
+                     "revoke": revokeURL}
+        self.stats = {name: CallStats() for name in self.urls}
+        retry = Retry(total=retries, connect=retries, read=retries,
+                      status=retries, backoff_factor=backoff,
+                      status_forcelist=(500, 502, 503, 504),
+                      allowed_methods=frozenset(["GET"]),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=poolSize,
+                              pool_maxsize=poolSize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _get(self, name, params):
+        """Given an endpoint name and query parameters, makes a GET request
+        to that endpoint and records its latency
+
+        Args:
+                name (str): The endpoint to call
+                params (dict): The query parameters to send
+
+        Returns:
+                The requests Response object
+
+        Raises:
+                requests.RequestException: If the endpoint could not be
+                    reached within the timeouts and retries, or still
+                    answered with a 5xx error after them
+        """
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.get(self.urls[name], params=params,
+                                        timeout=self.timeout)
+            if response.status_code >= 500:
+                raise requests.HTTPError(
+                    ("{} answered {}").format(name, response.status_code),
+                    response=response)
+            failed = False
+            return response
+        finally:
+            self.stats[name].record(time.perf_counter() - start, failed)
+
+    def tokenInfo(self, access_token):
+        """Given an access token, asks Google what it is valid for
+
+        Args:
+                access_token (str): The access token to introspect
+
+        Returns:
+                The decoded tokeninfo dict, holding "error" if it is invalid
+        """
+        return self._get("tokeninfo", {"access_token": access_token}).json()
+
+    def userInfo(self, access_token):
+        """Given an access token, obtains the profile of its Google user
+
+        Args:
+                access_token (str): The user's access token
+
+        Returns:
+                The decoded userinfo dict
+        """
+        return self._get("userinfo", {"access_token": access_token,
+                                      "alt": "json"}).json()
+
+    def revoke(self, access_token):
+        """Given an access token, asks Google to revoke it
+
+        Args:
+                access_token (str): The access token to revoke
+
+        Returns:
+                True if Google revoked the token, False otherwise
+        """
+        return self._get("revoke", {"token": access_token}).status_code == 200
+
+    def serializeStats(self):
+        """dict: Returns the latency counters by endpoint name"""
+        return {name: stats.serialize for name, stats in self.stats.items()}
+
+
+OAuthClientConfig = namedtuple("OAuthClientConfig", [
+    "client_id", "client_secret", "auth_uri", "token_uri", "revoke_uri",
+    "mtime"])
+
+
+def loadClientConfig(path):
+    """Given the path of a Google client_secrets.json file for a web
+    application, parses it into an OAuthClientConfig
+
+    Args:
+            path (str): The client secrets file to read
+
+    Returns:
+            The immutable OAuthClientConfig for the file
+    """
+    with open(path, "r") as f:
+        web = json.load(f)["web"]
+    return OAuthClientConfig(client_id=web["client_id"],
+                             client_secret=web["client_secret"],
+                             auth_uri=web.get("auth_uri"),
+                             token_uri=web.get("token_uri"),
+                             revoke_uri=web.get("revoke_uri"),
+                             mtime=os.path.getmtime(path))
+
+
+class ClientSecrets:
+    """The OAuth client configuration, read once and kept in memory along
+    with the oauth2client flow built from it. The file is only read again
+    when reload() is called, e.g. on SIGHUP
+
+    Attributes:
+        path (str): The client secrets file
+        config (OAuthClientConfig): The current configuration
+        flow (OAuth2WebServerFlow): A flow for exchanging one time codes
+            sent by the login page. It is never modified, so all requests
+            can share it
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.reload()
+
+    def reload(self):
+        """Reads the client secrets file again and rebuilds the flow. The
+        new configuration and flow are swapped in together
+        """
+        config = loadClientConfig(self.path)
+        uris = {name: getattr(config, name) for name in
+                ("auth_uri", "token_uri", "revoke_uri")
+                if getattr(config, name) is not None}
+        flow = OAuth2WebServerFlow(config.client_id, config.client_secret,
+                                   scope="", redirect_uri="postmessage",
+                                   **uris)
+        self.config, self.flow = config, flow
+
+    def reloadIfChanged(self):
+        """Reloads the configuration if the file changed since it was read
+
+        Returns:
+                True if the configuration was reloaded
+        """
+        if os.path.getmtime(self.path) == self.config.mtime:
+            return False
+        self.reload()
+        return True
+
+    def reloadOnSignal(self, signum=getattr(signal, "SIGHUP", None)):
+        """Installs a handler that reloads the configuration, if the file
+        changed, whenever the process receives signum (SIGHUP by default).
+        Does nothing where the signal does not exist or outside the main
+        thread
+
+        Args:
+                signum (int): The signal to reload on
+        """
+        if signum is None:
+            return
+        try:
+            signal.signal(signum, lambda *args: self.reloadIfChanged())
+        except ValueError:
+            # Signal handlers can only be installed from the main thread
+            pass
@@ -0,0 +1,179 @@
+"""
+Shared setup for the tests. The application module opens its database and
+reads client_secrets.json when it is imported, so the environment is set
+here, before any test imports it: a throwaway SQLite database, and the
+repository as the working directory
+"""
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+testDir = tempfile.mkdtemp(prefix="catalogTests")
+
+sys.path.insert(0, repoDir)
+os.chdir(repoDir)
+os.environ["CATALOG_DATABASE_URL"] = "sqlite:///" + os.path.join(
+    testDir, "itemCatalog.db")
+os.environ.pop("CATALOG_REPLICA_DATABASE_URL", None)
+os.environ["CATALOG_SECRET_KEY"] = "test"
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(testDir, ignore_errors=True)
+
+
+class StubServer:
+    """A local HTTP server standing in for Google. Every GET is answered
+    with the next queued reply, or the default one once the queue is empty
+
+    Attributes:
+        paths (list): The path of every request received, in order
+    """
+
+    def __init__(self):
+        self.paths = []
+        self._replies = deque()
+        self._default = (200, {}, 0)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.paths.append(self.path)
+                status, body, delay = stub._nextReply()
+                time.sleep(delay)
+                data = json.dumps(body).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except OSError:
+                    # The client gave up waiting
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever,
+                         kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def _nextReply(self):
+        try:
+            return self._replies.popleft()
+        except IndexError:
+            return self._default
+
+    def reply(self, status=200, body=None, delay=0, default=False):
+        """Queues a reply, or makes it the default one
+
+        Args:
+                status (int): The HTTP status to answer with
+                body: The JSON body to answer with
+                delay (float): Seconds to wait before answering
+                default (bool): Answer every request left with this reply
+        """
+        reply = (status, body if body is not None else {}, delay)
+        if default:
+            self._default = reply
+        else:
+            self._replies.append(reply)
+
+    def url(self, path):
+        """Given a path, returns its URL on this server"""
+        return ("http://127.0.0.1:{}{}").format(
+            self._server.server_address[1], path)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stubGoogle():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def application():
+    """The application module, with empty caches"""
+    import application
+    application.catalogCache.clear()
+    application.tokenCache.clear()
+    return application
+
+
+def loginCookie(application, **extra):
+    """Returns the Cookie header value of a session holding what gconnect
+    stores after a successful Google login
+    """
+    app = application.app
+    data = {"access_token": "token", "gplus_id": "1", "username": "Test",
+            "email": "test@example.com", "picture": "", "user_id": 1}
+    data.update(extra)
+    value = app.session_interface.get_signing_serializer(app).dumps(data)
+    return ("{}={}").format(app.config["SESSION_COOKIE_NAME"], value)
+
+
+def itemRows(application):
+    """Returns (id, cat_id, title) of every Item in the test database, by id
+    """
+    from databaseSetup import Item
+    rows = application.session.query(Item.id, Item.cat_id, Item.title).all()
+    application.session.remove()
+    return sorted(rows)
+
+
+@pytest.fixture
+def catalog(application):
+    """Empties the test database and fills it with a user, the Soccer and
+    Basketball categories, and the Soccer items Jersey and Two Shinguards
+
+    Returns:
+            A dict of the ids of everything made, by name
+    """
+    from databaseSetup import Category, Item, ItemChange, User
+    session = application.session
+    for model in (ItemChange, Item, Category, User):
+        session.query(model).delete()
+    # Start the ids over, as AUTOINCREMENT would carry on after the deleted ones
+    session.execute("DELETE FROM sqlite_sequence")
+    user = User(id=1, name="Test", email="test@example.com", picture="")
+    soccer = Category(id=1, name="Soccer")
+    basketball = Category(id=2, name="Basketball")
+    session.add_all([user, soccer, basketball])
+    session.add_all([Item(id=1, title="Jersey", description="A shirt",
+                          cat_id=1, user_id=1),
+                     Item(id=2, title="Two Shinguards", description="Pads",
+                          cat_id=1, user_id=1)])
+    session.commit()
+    session.remove()
+    application.catalogChanged()
+    application.userCache.clear()
+    return {"user": 1, "Soccer": 1, "Basketball": 2, "Jersey": 1,
+            "Two Shinguards": 2}
+
+
+@pytest.fixture
+def client(application, catalog):
+    """A test client logged in as the user of the catalog fixture"""
+    client = application.app.test_client()
+    with client.session_transaction() as loginSession:
+        loginSession.update({"access_token": "token", "gplus_id": "1",
+                             "username": "Test", "picture": "",
+                             "email": "test@example.com", "user_id": 1})
+    return client
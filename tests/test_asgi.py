@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import loginCookie
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("asgiref")
+
+
+async def get(asgi_app, path, cookie=None):
+    """Sends a GET request through an ASGI application and returns the
+    status of its response
+    """
+    headers = [(b"host", b"localhost")]
+    if cookie is not None:
+        headers.append((b"cookie", cookie.encode("latin-1")))
+    scope = {"type": "http", "asgi": {"version": "3.0"},
+             "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode("latin-1"),
+             "query_string": b"", "root_path": "", "headers": headers,
+             "client": ("127.0.0.1", 50000), "server": ("localhost", 80)}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+    await asgi_app(scope, receive, send)
+    return messages[0]["status"]
+
+
+def test_slow_flask_requests_run_concurrently(application, stubGoogle,
+                                              monkeypatch):
+    import asgi
+    # Every logout waits a second on Google
+    stubGoogle.reply(delay=1, default=True)
+    monkeypatch.setattr(application, "google", application.GoogleAPIClient(
+        retries=0, revokeURL=stubGoogle.url("/revoke")))
+    cookie = loginCookie(application)
+
+    async def logoutFour():
+        return await asyncio.gather(*[
+            get(asgi.asgi_app, "/gdisconnect", cookie) for i in range(4)])
+    start = time.perf_counter()
+    statuses = asyncio.run(logoutFour())
+    elapsed = time.perf_counter() - start
+
+    assert statuses == [302] * 4
+    assert len(stubGoogle.paths) == 4
+    # One after the other they would take four seconds
+    assert elapsed < 2.5
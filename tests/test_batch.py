@@ -0,0 +1,53 @@
+from conftest import itemRows
+
+
+def statuses(results, kind):
+    return [result["status"] for result in results[kind]]
+
+
+def test_updates_freeing_titles_apply_in_any_order(application, client):
+    for updates in ([{"id": 1, "title": "Jersey 2"},
+                     {"id": 2, "title": "Jersey"}],
+                    [{"id": 2, "title": "Jersey 3"},
+                     {"id": 1, "title": "Jersey 2"}]):
+        response = client.post("/catalog/batch", json={"update": updates})
+        assert response.status_code == 200
+        assert statuses(response.get_json(), "update") == ["updated"] * 2
+    assert itemRows(application) == [(1, 1, "Jersey 2"), (2, 1, "Jersey 3")]
+
+
+def test_updates_can_swap_titles(application, client):
+    response = client.post("/catalog/batch", json={"update": [
+        {"id": 1, "title": "Two Shinguards"}, {"id": 2, "title": "Jersey"}]})
+    assert statuses(response.get_json(), "update") == ["updated"] * 2
+    assert itemRows(application) == [(1, 1, "Two Shinguards"),
+                                     (2, 1, "Jersey")]
+
+
+def test_rejected_update_keeps_its_title_taken(application, client):
+    client.post("/catalog/add", data={"title": "Ball", "description": "",
+                                      "cat_id": "1"})
+    # Jersey cannot take the title of Ball, so it keeps its own
+    response = client.post("/catalog/batch", json={"update": [
+        {"id": 1, "title": "Ball"}, {"id": 2, "title": "Jersey"}]})
+    assert response.status_code == 200
+    assert statuses(response.get_json(), "update") == ["error", "error"]
+    assert itemRows(application) == [(1, 1, "Jersey"),
+                                     (2, 1, "Two Shinguards"), (3, 1, "Ball")]
+
+
+def test_rows_of_the_wrong_type_fail_on_their_own(application, client):
+    response = client.post("/catalog/batch", json={
+        "create": [{"title": "C", "cat_id": 1, "description": {"x": 1}},
+                   {"title": "D", "cat_id": True},
+                   {"title": "E", "cat_id": 2, "description": None}],
+        "update": [{"id": True, "title": "F"},
+                   {"id": 2, "description": ["Pads"]}],
+        "delete": [{"id": False}]})
+    results = response.get_json()
+    assert response.status_code == 200
+    assert statuses(results, "create") == ["error", "error", "created"]
+    assert statuses(results, "update") == ["error", "error"]
+    assert statuses(results, "delete") == ["error"]
+    assert itemRows(application) == [(1, 1, "Jersey"),
+                                     (2, 1, "Two Shinguards"), (3, 2, "E")]
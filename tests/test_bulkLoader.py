@@ -0,0 +1,22 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import repoDir
+
+
+def test_generate_into_another_database(tmp_path):
+    other = tmp_path / "other.db"
+    subprocess.run(
+        [sys.executable, os.path.join(repoDir, "bulkLoader.py"),
+         "--db", "sqlite:///" + str(other), "generate", "--users", "2",
+         "--categories", "3", "--items", "50"],
+        cwd=str(tmp_path), check=True, stdout=subprocess.DEVNULL,
+        env=dict(os.environ, CATALOG_DATABASE_URL="sqlite:///" + str(
+            tmp_path / "default.db")))
+    connection = sqlite3.connect(str(other))
+    assert connection.execute("SELECT count(*) FROM item").fetchone() == (50,)
+    assert connection.execute(
+        "SELECT count(*) FROM category").fetchone() == (3,)
+    connection.close()
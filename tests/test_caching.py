@@ -0,0 +1,52 @@
+from caching import LRUCache, VersionedCache, estimateSize
+
+
+def test_bump_drops_every_entry():
+    cache = VersionedCache(1024)
+    for version in range(5):
+        for key in range(6):
+            cache.getOrLoad(("page", key), lambda: b"x" * 1000)
+        cache.bump()
+    assert len(cache) == 0
+    assert cache.bytes == 0
+    cache.getOrLoad(("page", 0), lambda: b"x")
+    assert len(cache) == 1
+
+
+def test_values_loaded_before_a_bump_are_not_stored():
+    cache = VersionedCache(1024)
+
+    def loadDuringWrite():
+        cache.bump()
+        return "stale"
+    assert cache.getOrLoad(("page",), loadDuringWrite) == "stale"
+    assert len(cache) == 0
+    assert cache.getOrLoad(("page",), lambda: "fresh") == "fresh"
+
+
+def test_byte_cap_evicts_least_recently_used():
+    size = estimateSize(b"x" * 1000)
+    cache = LRUCache(1024, maxbytes=size * 3)
+    for key in "abcd":
+        cache.set(key, b"x" * 1000)
+    assert cache.get("a") is None
+    assert [cache.get(key) is not None for key in "bcd"] == [True] * 3
+    assert cache.bytes == size * 3
+    assert cache.evictions == 1
+    cache.pop("b")
+    assert cache.bytes == size * 2
+
+
+def test_values_over_the_byte_cap_are_not_cached():
+    cache = LRUCache(1024, maxbytes=100)
+    cache.set("big", b"x" * 1000)
+    assert cache.get("big") is None
+    assert cache.bytes == 0
+
+
+def test_estimate_size_follows_containers():
+    items = [{"id": i, "title": ("Item {}").format(i)} for i in range(10000)]
+    estimate = estimateSize(items)
+    exact = estimateSize(items[:64]) * 10000 / 64
+    assert 0.8 * exact < estimate < 1.2 * exact
+    assert estimateSize(b"x" * 1000) >= 1000
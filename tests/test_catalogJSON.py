@@ -0,0 +1,72 @@
+import pytest
+
+# Later than any Last-Modified: on its own it would always answer 304, as
+# it does for a write made within the same second as the last poll
+future = "Fri, 01 Jan 2100 00:00:00 GMT"
+
+
+@pytest.fixture(params=[False, True], ids=["cached", "streamed"])
+def streaming(request, application, monkeypatch):
+    monkeypatch.setitem(application.app.config, "STREAM_CATALOG_JSON",
+                        request.param)
+    return request.param
+
+
+def addItem(client, title):
+    response = client.post("/catalog/add", data={
+        "title": title, "description": "", "cat_id": "1"})
+    assert response.status_code == 302
+
+
+def test_catalog_json_answers_304_for_the_current_etag(client, streaming):
+    first = client.get("/catalog.json")
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+    assert first.headers["Last-Modified"]
+
+    again = client.get("/catalog.json", headers={
+        "If-None-Match": first.headers["ETag"],
+        "If-Modified-Since": first.headers["Last-Modified"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert again.get_data() == b""
+
+
+def test_catalog_json_falls_back_to_if_modified_since(client, streaming):
+    first = client.get("/catalog.json")
+    again = client.get("/catalog.json", headers={
+        "If-Modified-Since": first.headers["Last-Modified"]})
+    assert again.status_code == 304
+
+
+def test_write_in_the_same_second_changes_the_etag(client, streaming):
+    addItem(client, "Ball")
+    first = client.get("/catalog.json")
+    addItem(client, "Whistle")
+
+    again = client.get("/catalog.json", headers={
+        "If-None-Match": first.headers["ETag"],
+        "If-Modified-Since": future})
+    assert again.status_code == 200
+    assert again.headers["ETag"] != first.headers["ETag"]
+    titles = [item["title"] for category in again.get_json()["Category"]
+              for item in category.get("Item", [])]
+    assert "Whistle" in titles
+
+
+def test_streamed_and_cached_bodies_match_on_non_ascii(application, client,
+                                                       monkeypatch):
+    addItem(client, "Camiseta ñ \U0001f3c6")
+    bodies = {}
+    for streamed in (False, True):
+        monkeypatch.setitem(application.app.config, "STREAM_CATALOG_JSON",
+                            streamed)
+        application.catalogCache.clear()
+        bodies[streamed] = client.get("/catalog.json").get_data()
+
+    assert bodies[False] == bodies[True]
+    assert b"Camiseta \\u00f1 \\ud83c\\udfc6" in bodies[False]
+    with application.app.app_context():
+        expected = application.jsonify(
+            Category=application.getSerializedCatalog()).get_data()
+    assert bodies[False] == expected
@@ -0,0 +1,66 @@
+def batch(client, **rows):
+    response = client.post("/catalog/batch", json=rows)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def changesSince(client, since, limit=None):
+    url = ("/catalog/changes?since={}").format(since)
+    if limit is not None:
+        url += ("&limit={}").format(limit)
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_without_since_only_the_last_seq_is_returned(client):
+    assert client.get("/catalog/changes").get_json() == {"last_seq": 0}
+    batch(client, create=[{"title": "Ball", "cat_id": 1}])
+    assert client.get("/catalog/changes").get_json() == {"last_seq": 1}
+
+
+def test_deleted_ids_are_not_handed_out_again(client):
+    # Two Shinguards holds the highest id
+    batch(client, delete=[{"id": 2}])
+    created = batch(client, create=[{"title": "X", "cat_id": 2}])
+    assert created["create"][0]["id"] == 3
+
+    changes = changesSince(client, 0)["changes"]
+    assert changes == [
+        {"action": "delete", "cat_id": 1, "id": 2, "item": None, "seq": 1},
+        {"action": "create", "cat_id": 2, "id": 3, "seq": 2,
+         "item": {"cat_id": 2, "description": None, "id": 3, "title": "X"}}]
+
+
+def test_changes_to_one_item_collapse_to_the_last(client):
+    batch(client, update=[{"id": 1, "title": "Shirt"}])
+    batch(client, update=[{"id": 1, "cat_id": 2}])
+    batch(client, update=[{"id": 2, "description": "Shin pads"}])
+
+    changes = changesSince(client, 0)["changes"]
+    assert [(c["id"], c["action"], c["seq"]) for c in changes] == [
+        (1, "update", 2), (2, "update", 3)]
+    assert changes[0]["cat_id"] == 2
+    assert changes[0]["item"]["title"] == "Shirt"
+    # A client that already saw the first update only gets the later ones
+    assert [c["seq"] for c in changesSince(client, 1)["changes"]] == [2, 3]
+
+
+def test_pages_follow_next_until_the_last_seq(client):
+    batch(client, create=[{"title": ("Item {}").format(i), "cat_id": 2}
+                          for i in range(5)])
+    batch(client, delete=[{"id": 1}])
+
+    page = changesSince(client, 0, limit=2)
+    seen = []
+    while True:
+        seen += [c["seq"] for c in page["changes"]]
+        if page["next"] is None:
+            break
+        assert page["next"] == ("/catalog/changes?since={}&limit=2").format(
+            page["last_seq"])
+        page = client.get(page["next"]).get_json()
+    assert seen == [1, 2, 3, 4, 5, 6]
+    assert page["last_seq"] == 6
+    assert changesSince(client, 6) == {"changes": [], "last_seq": 6,
+                                       "next": None}
@@ -0,0 +1,27 @@
+from flask import Config
+
+
+def test_only_the_given_keys_are_read(application, monkeypatch):
+    config = Config(".")
+    config.update({"MAX_CONTENT_LENGTH": None, "SECRET_KEY": None,
+                   "DB_POOL_SIZE": 5, "STREAM_CATALOG_JSON": False})
+    monkeypatch.setenv("CATALOG_MAX_CONTENT_LENGTH", "1024")
+    monkeypatch.setenv("CATALOG_SECRET_KEY", "secret")
+    monkeypatch.setenv("CATALOG_DB_POOL_SIZE", "20")
+    monkeypatch.setenv("CATALOG_STREAM_CATALOG_JSON", "yes")
+
+    application.configFromEnvironment(
+        config, ["SECRET_KEY", "DB_POOL_SIZE", "STREAM_CATALOG_JSON"])
+
+    assert config["MAX_CONTENT_LENGTH"] is None
+    assert config["SECRET_KEY"] == "secret"
+    assert config["DB_POOL_SIZE"] == 20
+    assert config["STREAM_CATALOG_JSON"] is True
+
+
+def test_flask_settings_are_not_read_from_the_environment(application):
+    keys = application.flaskConfigKeys
+    assert "PERMANENT_SESSION_LIFETIME" in keys
+    assert "DB_POOL_SIZE" not in keys
+    # Set by conftest as CATALOG_SECRET_KEY
+    assert application.app.config["SECRET_KEY"] == "test"
@@ -0,0 +1,136 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, event, inspect
+
+from databaseSetup import Category, setupDatabase
+
+# The tables of itemCatalog.db files made before the indexes were added
+oldSchema = """
+CREATE TABLE user (id INTEGER PRIMARY KEY, name VARCHAR(250) NOT NULL,
+                   email VARCHAR(250) NOT NULL, picture VARCHAR(250));
+CREATE TABLE category (id INTEGER PRIMARY KEY, name VARCHAR(80) NOT NULL,
+                       UNIQUE (name));
+CREATE TABLE item (cat_id INTEGER REFERENCES category(id),
+                   description VARCHAR(250), id INTEGER PRIMARY KEY,
+                   title VARCHAR(80) NOT NULL,
+                   user_id INTEGER REFERENCES user(id));
+INSERT INTO user VALUES (1, 'Test', 'test@example.com', '');
+INSERT INTO category VALUES (1, 'Soccer');
+INSERT INTO item VALUES (1, 'A shirt', 1, 'Jersey', 1);
+"""
+
+
+@pytest.fixture
+def schemaEngine(tmp_path):
+    """An engine on a new SQLite file holding the current schema"""
+    engine = create_engine("sqlite:///" + str(tmp_path / "plans.db"))
+    setupDatabase(engine)
+    return engine
+
+
+def capturedStatements(application, call):
+    """Returns the (statement, parameters) of every query call runs"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    event.listen(application.engine, "before_cursor_execute", record)
+    try:
+        call()
+    finally:
+        event.remove(application.engine, "before_cursor_execute", record)
+        application.session.remove()
+    return statements
+
+
+def queryPlan(engine, statement, parameters):
+    """Returns the details of every step of the plan of a query"""
+    connection = engine.raw_connection()
+    try:
+        rows = connection.cursor().execute(
+            "EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    finally:
+        connection.close()
+    return [row[-1] for row in rows]
+
+
+def test_hot_lookups_never_scan(application, catalog, schemaEngine):
+    application.userCache.clear()
+    soccer = application.getCategory("Soccer")
+    lookups = {
+        "getItem": lambda: application.getItem(soccer, "Jersey"),
+        "getUserId": lambda: application.getUserId("test@example.com"),
+        "getAllItemsInCategory":
+            lambda: application.getAllItemsInCategory(soccer),
+        "getItemsPage": lambda: application.getItemsPage(soccer, 0, 10),
+        "isUniqueTitle": lambda: application.isUniqueTitle(1, "Jersey"),
+        # getCategory is answered by the category registry, so this is the
+        # query a lookup by name would run
+        "getCategory": lambda: application.session.query(Category).filter_by(
+            name="Soccer").one()
+    }
+    for name, lookup in lookups.items():
+        statements = capturedStatements(application, lookup)
+        assert statements, name
+        for statement, parameters in statements:
+            plan = queryPlan(schemaEngine, statement, parameters)
+            # SCAN CONSTANT ROW is the SELECT wrapping an EXISTS
+            scans = [step for step in plan if step.startswith("SCAN") and
+                     step != "SCAN CONSTANT ROW"]
+            assert not scans, (name, statement, plan)
+
+
+def test_get_category_runs_no_query(application, catalog):
+    application.getCategory("Soccer")
+    assert capturedStatements(
+        application, lambda: application.getCategory("Soccer")) == []
+
+
+def test_upgrade_adds_the_indexes(tmp_path):
+    path = str(tmp_path / "old.db")
+    sqlite3.connect(path).executescript(oldSchema)
+    engine = create_engine("sqlite:///" + path)
+    setupDatabase(engine)
+    indexes = {i["name"]: i for i in inspect(engine).get_indexes("item")}
+    assert indexes["ix_item_cat_id_title"]["unique"]
+    assert "ix_user_email" in [i["name"]
+                               for i in inspect(engine).get_indexes("user")]
+
+
+def test_upgrade_reports_duplicate_titles(tmp_path):
+    path = str(tmp_path / "old.db")
+    connection = sqlite3.connect(path)
+    connection.executescript(oldSchema)
+    connection.execute("INSERT INTO item VALUES (1, 'Another', 2, 'Jersey', "
+                       "1)")
+    connection.commit()
+    connection.close()
+    with pytest.raises(RuntimeError, match=r"\(1, 'Jersey'\) x2"):
+        setupDatabase(create_engine("sqlite:///" + path))
+
+
+def test_upgrade_adds_autoincrement_to_items(tmp_path):
+    path = str(tmp_path / "old.db")
+    connection = sqlite3.connect(path)
+    connection.executescript(oldSchema)
+    connection.execute("INSERT INTO item VALUES (1, 'Pads', 2, 'Shinguards', "
+                       "1)")
+    connection.commit()
+    engine = create_engine("sqlite:///" + path)
+    setupDatabase(engine)
+
+    itemSQL = connection.execute("SELECT sql FROM sqlite_master WHERE "
+                                 "name = 'item'").fetchone()[0]
+    assert "AUTOINCREMENT" in itemSQL
+    assert connection.execute("SELECT id, title, updated_at IS NOT NULL "
+                              "FROM item ORDER BY id").fetchall() == [
+        (1, "Jersey", 1), (2, "Shinguards", 1)]
+    indexes = {i["name"] for i in inspect(engine).get_indexes("item")}
+    assert {"ix_item_cat_id", "ix_item_cat_id_title"} <= indexes
+    # The search index is made again, with its triggers on the new table
+    connection.execute("DELETE FROM item WHERE id = 2")
+    connection.execute("INSERT INTO item (cat_id, title) VALUES (1, 'Ball')")
+    assert connection.execute("SELECT rowid FROM item_search WHERE "
+                              "item_search MATCH 'ball'").fetchall() == [(3,)]
+    connection.close()
@@ -0,0 +1,47 @@
+from conftest import itemRows
+
+
+def test_add_item_rejects_unknown_category(application, client):
+    for cat_id in ("999", "abc"):
+        response = client.post("/catalog/add", data={
+            "title": "Ghost", "description": "", "cat_id": cat_id})
+        assert response.status_code == 200
+        assert b"not found" in response.data
+    assert itemRows(application) == [(1, 1, "Jersey"),
+                                     (2, 1, "Two Shinguards")]
+
+
+def test_add_item(application, client):
+    response = client.post("/catalog/add", data={
+        "title": "Ball", "description": "Round", "cat_id": "2"})
+    assert response.status_code == 302
+    assert itemRows(application)[-1] == (3, 2, "Ball")
+
+
+def test_edit_item_moving_to_a_title_taken_in_the_old_category(
+        application, client):
+    # Jersey is taken in Soccer, but not in Basketball
+    response = client.post("/catalog/Soccer/Two Shinguards/edit", data={
+        "title": "Jersey", "description": "", "cat_id": "2"})
+    assert response.status_code == 302
+    assert itemRows(application) == [(1, 1, "Jersey"), (2, 2, "Jersey")]
+
+
+def test_edit_item_rejects_a_taken_title(application, client):
+    response = client.post("/catalog/Soccer/Two Shinguards/edit", data={
+        "title": "Jersey", "description": "", "cat_id": "1"})
+    assert response.status_code == 302
+    assert itemRows(application) == [(1, 1, "Jersey"),
+                                     (2, 1, "Two Shinguards")]
+
+
+def test_category_page_counts_items_only_when_whole(application, client):
+    pages = {url: client.get(url).get_data(as_text=True) for url in (
+        "/catalog/Soccer/items", "/catalog/Soccer/items?limit=1",
+        "/catalog/Soccer/items?after=1&limit=1",
+        "/catalog/Basketball/items")}
+    assert "Soccer Items (2 items)" in pages["/catalog/Soccer/items"]
+    assert "Basketball Items (0 items)" in pages["/catalog/Basketball/items"]
+    for url in ("/catalog/Soccer/items?limit=1",
+                "/catalog/Soccer/items?after=1&limit=1"):
+        assert "Soccer Items</h2>" in pages[url]
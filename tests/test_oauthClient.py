@@ -0,0 +1,80 @@
+from collections import namedtuple
+
+import pytest
+import requests
+
+from oauthClient import GoogleAPIClient
+
+Credentials = namedtuple("Credentials", ["access_token", "id_token"])
+
+
+class StubFlow:
+    """Stands in for the oauth2client flow, exchanging any code"""
+
+    def step2_exchange(self, code, http=None):
+        return Credentials("token", {"sub": "1"})
+
+
+def stubClient(stubGoogle, **options):
+    """A GoogleAPIClient with every endpoint on the stub server"""
+    options.setdefault("backoff", 0)
+    return GoogleAPIClient(tokeninfoURL=stubGoogle.url("/tokeninfo"),
+                           userinfoURL=stubGoogle.url("/userinfo"),
+                           revokeURL=stubGoogle.url("/revoke"), **options)
+
+
+def test_flaky_5xx_is_retried(stubGoogle):
+    stubGoogle.reply(503)
+    stubGoogle.reply(200, {"user_id": "1", "issued_to": "app"})
+    client = stubClient(stubGoogle, retries=2)
+    assert client.tokenInfo("token") == {"user_id": "1", "issued_to": "app"}
+    assert [path.split("?")[0] for path in stubGoogle.paths] == [
+        "/tokeninfo", "/tokeninfo"]
+    stats = client.serializeStats()["tokeninfo"]
+    assert stats["calls"] == 1 and stats["errors"] == 0
+
+
+def test_5xx_after_the_retries_raises(stubGoogle):
+    stubGoogle.reply(502, default=True)
+    client = stubClient(stubGoogle, retries=1)
+    with pytest.raises(requests.RequestException):
+        client.revoke("token")
+    assert len(stubGoogle.paths) == 2
+    assert client.serializeStats()["revoke"]["errors"] == 1
+
+
+def test_read_timeout_raises_after_the_retries(stubGoogle):
+    stubGoogle.reply(delay=0.5, default=True)
+    client = stubClient(stubGoogle, retries=2, readTimeout=0.1)
+    with pytest.raises(requests.RequestException):
+        client.userInfo("token")
+    assert len(stubGoogle.paths) == 3
+    stats = client.serializeStats()["userinfo"]
+    assert stats["errors"] == 1
+    assert 0.3 <= stats["max_seconds"] < 1.5
+
+
+def test_gconnect_answers_503_when_google_is_down(application, catalog,
+                                                  stubGoogle, monkeypatch):
+    stubGoogle.reply(503, default=True)
+    monkeypatch.setattr(application.clientSecrets, "flow", StubFlow())
+    monkeypatch.setattr(application, "google",
+                        stubClient(stubGoogle, retries=1))
+    client = application.app.test_client()
+    with client.session_transaction() as loginSession:
+        loginSession["state"] = "state"
+    response = client.post("/gconnect?state=state", data=b"code")
+    assert response.status_code == 503
+    assert len(stubGoogle.paths) == 2
+
+
+def test_gdisconnect_answers_503_when_google_is_down(application, client,
+                                                     stubGoogle,
+                                                     monkeypatch):
+    stubGoogle.reply(500, default=True)
+    monkeypatch.setattr(application, "google",
+                        stubClient(stubGoogle, retries=0))
+    response = client.get("/gdisconnect")
+    assert response.status_code == 503
+    with client.session_transaction() as loginSession:
+        assert loginSession["access_token"] == "token"
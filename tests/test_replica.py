@@ -0,0 +1,70 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+from sqlalchemy import create_engine
+
+from conftest import repoDir
+from databaseSetup import setupDatabase
+
+# Run in a process of its own, as the engines are made on import
+routingCheck = """
+import json
+import application
+
+client = application.app.test_client()
+with client.session_transaction() as loginSession:
+    loginSession.update({"username": "Test", "email": "test@example.com",
+                         "user_id": 1})
+results = {
+    "json": client.get("/catalog/Soccer.json").get_json(),
+    "page": "Replica Jersey" in client.get(
+        "/catalog/Soccer/items").get_data(as_text=True),
+    "add": client.post("/catalog/add", data={
+        "title": "Ball", "description": "", "cat_id": "1"}).status_code
+}
+print(json.dumps(results))
+"""
+
+
+def makeDatabase(path, itemTitle):
+    setupDatabase(create_engine("sqlite:///" + path))
+    connection = sqlite3.connect(path)
+    connection.execute("INSERT INTO user (id, name, email, picture) "
+                       "VALUES (1, 'Test', 'test@example.com', '')")
+    connection.execute("INSERT INTO category (id, name) VALUES (1, 'Soccer')")
+    connection.execute("INSERT INTO item (id, title, description, cat_id, "
+                       "user_id) VALUES (1, ?, '', 1, 1)", (itemTitle,))
+    connection.commit()
+    connection.close()
+
+
+def itemTitles(path):
+    connection = sqlite3.connect(path)
+    titles = [row[0] for row in connection.execute(
+        "SELECT title FROM item ORDER BY id")]
+    connection.close()
+    return titles
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(tmp_path):
+    primary = str(tmp_path / "primary.db")
+    replica = str(tmp_path / "replica.db")
+    makeDatabase(primary, "Primary Jersey")
+    makeDatabase(replica, "Replica Jersey")
+    env = dict(os.environ, CATALOG_DATABASE_URL="sqlite:///" + primary,
+               CATALOG_REPLICA_DATABASE_URL="sqlite:///" + replica,
+               PYTHONPATH=repoDir)
+    output = subprocess.run([sys.executable, "-c", routingCheck], cwd=repoDir,
+                            env=env, check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    results = json.loads(output.strip().splitlines()[-1])
+
+    assert [item["title"] for item in results["json"]["Item"]] == [
+        "Replica Jersey"]
+    assert results["page"]
+    assert results["add"] == 302
+    assert itemTitles(primary) == ["Primary Jersey", "Ball"]
+    assert itemTitles(replica) == ["Replica Jersey"]
@@ -0,0 +1,40 @@
+import threading
+
+
+def test_threads_read_and_write_on_sessions_of_their_own(application,
+                                                         catalog):
+    app = application.app
+    sessions = {}
+    statuses = []
+    lock = threading.Lock()
+    start = threading.Barrier(8)
+
+    def worker(number):
+        client = app.test_client()
+        with client.session_transaction() as loginSession:
+            loginSession.update({"username": "Test", "user_id": 1,
+                                 "email": "test@example.com"})
+        start.wait()
+        mine = []
+        for i in range(10):
+            application.catalogCache.bump()
+            mine.append(client.get("/catalog/Soccer.json").status_code)
+            mine.append(client.post("/catalog/add", data={
+                "title": ("Item {} {}").format(number, i),
+                "description": "", "cat_id": "1"}).status_code)
+        with lock:
+            sessions[number] = application.session()
+            statuses.extend(mine)
+        application.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(number,))
+               for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(set(statuses)) == [200, 302]
+    assert len(set(map(id, sessions.values()))) == 8
+    response = app.test_client().get("/catalog/Soccer.json?limit=500")
+    assert len(response.get_json()["Item"]) == 2 + 8 * 10
@@ -0,0 +1,15 @@
+#!/usr/bin/env python
+"""
+Udacity Item Catalog Project
+
+Python Version 3.7.2 used when created
+
+This module is the production (WSGI) entry point for the Flask application
+in application.py. With the settings in gunicorn.conf.py:
+
+    CATALOG_SECRET_KEY=... gunicorn -c gunicorn.conf.py
+"""
+
+from application import createApp
+
+app = createApp()